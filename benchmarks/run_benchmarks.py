@@ -0,0 +1,187 @@
+"""Time the dashboard, insert and login paths against synthetic users.
+
+Run from the project root:
+
+    python -m benchmarks.run_benchmarks --sizes 1000 100000 1000000 --output results.json
+    python -m benchmarks.run_benchmarks --compare baseline.json
+
+By default a throwaway SQLite database stands in for the real one; pass
+--backend mysql to use the MySQL settings from .env (point DB_NAME at a
+scratch database). Results are written as JSON, and --compare exits with
+status 1 when an operation's median got slower than --threshold times the
+baseline (and by more than --min-delta-ms).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+from dotenv import load_dotenv
+
+from benchmarks.synthetic import generate_transactions, populate
+from expense_tracker.columnar import TransactionColumns
+from expense_tracker.dashboard import DashboardFigure, summarize_category_totals
+from expense_tracker.storage import BUILTIN_CATEGORY_IDS, SQLiteStorage, create_storage
+from expense_tracker.write_behind import WriteBehindQueue
+
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+BULK_INSERT_ROWS = 1000
+
+
+def measure(func, repeat):
+    """Run func repeat times after one warm-up call; returns timing stats in milliseconds"""
+    func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "repeat": repeat,
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
+
+
+def benchmark_user(storage, size, repeat):
+    userid = f"bench_{size}"
+    started = time.perf_counter()
+    populate(storage, userid, size)
+    print(f"  generated {size:,} rows in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    names = {category_id: name for name, category_id in BUILTIN_CATEGORY_IDS.items()}
+
+    def aggregate():
+        return summarize_category_totals((names[category_id], total, count) for category_id, total, count in storage.category_totals(userid))
+
+    totals = aggregate()
+    chart = DashboardFigure()
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    canvas = FigureCanvasAgg(chart.figure)
+
+    def render_chart():
+        chart.update(totals["categories"], totals["income"], totals["total_expense"])
+        canvas.draw()
+
+    today = date.today()
+    extra = generate_transactions(userid, (repeat + 1) * (2 * BULK_INSERT_ROWS + 1), seed=size)
+
+    def single_insert():
+        row = next(extra)
+        storage.add_transaction(userid, row[1], row[2], row[3], row[4], row[5])
+
+    def bulk_insert():
+        storage.add_transactions([next(extra) for _ in range(BULK_INSERT_ROWS)])
+
+    write_queue = WriteBehindQueue(storage)
+
+    def queued_inserts():
+        futures = [write_queue.submit(next(extra)) for _ in range(BULK_INSERT_ROWS)]
+        for future in futures:
+            future.result()
+
+    results = {
+        "aggregation": measure(aggregate, repeat),
+        "chart_render": measure(render_chart, repeat),
+        "single_insert": measure(single_insert, repeat),
+        "bulk_insert": measure(bulk_insert, repeat),
+        "write_behind_insert": measure(queued_inserts, repeat),
+        "login_lookup": measure(lambda: storage.get_password(userid), repeat),
+        "history_first_page": measure(lambda: storage.history_page(userid, "Newest first"), repeat),
+        "monthly_trend": measure(lambda: storage.monthly_totals(userid, f"{today.year - 1:04d}-{today.month:02d}"), repeat),
+    }
+    write_queue.close()
+
+    columns = TransactionColumns.from_chunks(storage.stream_transactions(userid, 10000))
+    results.update({
+        "columnar_load": measure(lambda: TransactionColumns.from_chunks(storage.stream_transactions(userid, 10000)), 3),
+        "columnar_by_category": measure(columns.totals_by_category, repeat),
+        "columnar_by_month": measure(columns.totals_by_month, repeat),
+        "columnar_running_balance": measure(columns.running_balance, repeat),
+        "columnar_filter": measure(lambda: columns.filter(start=date(today.year, 1, 1), categories=["Housing"]), repeat),
+    })
+    results["columnar_load"]["bytes"] = columns.nbytes
+    results["bulk_insert"]["rows"] = BULK_INSERT_ROWS
+    results["write_behind_insert"]["rows"] = BULK_INSERT_ROWS
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Return (size, operation, baseline ms, current ms) for every regression"""
+    regressions = []
+    for size, operations in results["sizes"].items():
+        for operation, stats in operations.items():
+            previous = baseline.get("sizes", {}).get(size, {}).get(operation)
+            if not previous:
+                continue
+            slower_by = stats["median_ms"] - previous["median_ms"]
+            if stats["median_ms"] > previous["median_ms"] * threshold and slower_by > min_delta_ms:
+                regressions.append((size, operation, previous["median_ms"], stats["median_ms"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="rows per synthetic user")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per operation")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="previous results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed slowdown factor against the baseline")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    import matplotlib
+    matplotlib.use("Agg")
+
+    with tempfile.TemporaryDirectory() as scratch:
+        if args.backend == "sqlite":
+            storage = SQLiteStorage(os.path.join(scratch, "bench.db"))
+        else:
+            load_dotenv()
+            storage = create_storage("mysql")
+        storage.initialize()
+
+        results = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "backend": args.backend,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": {},
+        }
+        try:
+            for size in args.sizes:
+                print(f"Benchmarking {size:,} rows...", file=sys.stderr)
+                results["sizes"][str(size)] = benchmark_user(storage, size, args.repeat)
+        finally:
+            storage.close()
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    for size, operations in results["sizes"].items():
+        for operation, stats in operations.items():
+            print(f"{size:>9} {operation:<20} median {stats['median_ms']:>10.3f} ms  p95 {stats['p95_ms']:>10.3f} ms")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_delta_ms)
+        for size, operation, before, after in regressions:
+            print(f"REGRESSION {size} {operation}: {before:.3f} ms -> {after:.3f} ms")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""Synthetic users and transactions for benchmarking the storage backends"""
+
+import random
+from datetime import date, timedelta
+
+from expense_tracker.dashboard import EXPENSE_CATEGORIES, INCOME_CATEGORY
+from expense_tracker.storage import BUILTIN_CATEGORY_IDS
+
+
+# Share of rows and typical amount (median, spread) per transaction type
+CATEGORY_PROFILE = {
+    "Food & Dining": (0.35, 350, 0.8),
+    "Transportation": (0.20, 150, 0.7),
+    "Housing": (0.05, 15000, 0.4),
+    "Entertainment": (0.15, 600, 0.9),
+    "Other": (0.15, 500, 1.1),
+    INCOME_CATEGORY: (0.10, 40000, 0.5),
+}
+COMMENTS = ["", "", "", "groceries", "cab to office", "rent", "movie night", "salary", "gift", "electricity bill"]
+
+assert set(CATEGORY_PROFILE) == set(EXPENSE_CATEGORIES + [INCOME_CATEGORY])
+
+
+def generate_transactions(userid, count, seed=0, days=3 * 365, today=None):
+    """Yield count (userid, date, txn_date, category_id, amount, comment) rows spread over the last days"""
+    rng = random.Random(seed)
+    today = today or date.today()
+    names = list(CATEGORY_PROFILE)
+    weights = [CATEGORY_PROFILE[name][0] for name in names]
+
+    for _ in range(count):
+        expense_type = rng.choices(names, weights)[0]
+        _, median, spread = CATEGORY_PROFILE[expense_type]
+        amount = round(max(rng.lognormvariate(0, spread) * median, 1), 2)
+        txn_date = today - timedelta(days=rng.randrange(days))
+        yield (userid, txn_date.strftime("%d/%m/%Y"), txn_date, BUILTIN_CATEGORY_IDS[expense_type], amount, rng.choice(COMMENTS))
+
+
+def populate(storage, userid, count, batch_size=10000, seed=0):
+    """Create userid (password "Bench123") with count synthetic transactions"""
+    storage.create_user(userid, "Bench123", f"Benchmark {count}")
+    batch = []
+    for row in generate_transactions(userid, count, seed):
+        batch.append(row)
+        if len(batch) == batch_size:
+            storage.add_transactions(batch)
+            batch = []
+    storage.add_transactions(batch)
@@ -0,0 +1,35 @@
+"""Headless core of the Expense Tracker: storage, validation, import/export and dashboard totals"""
+
+from expense_tracker.core import BalanceLedger, ExpenseService
+from expense_tracker.dashboard import (
+    EXPENSE_CATEGORIES,
+    INCOME_CATEGORY,
+    DashboardFigure,
+    summarize_category_totals,
+)
+from expense_tracker.storage import (
+    HISTORY_SORTS,
+    MySQLStorage,
+    SQLiteStorage,
+    Storage,
+    create_storage,
+)
+from expense_tracker.transfer import TransactionExporter, TransactionImporter
+from expense_tracker.validation import InputValidator
+
+__all__ = [
+    "BalanceLedger",
+    "ExpenseService",
+    "EXPENSE_CATEGORIES",
+    "INCOME_CATEGORY",
+    "DashboardFigure",
+    "summarize_category_totals",
+    "HISTORY_SORTS",
+    "MySQLStorage",
+    "SQLiteStorage",
+    "Storage",
+    "create_storage",
+    "TransactionExporter",
+    "TransactionImporter",
+    "InputValidator",
+]
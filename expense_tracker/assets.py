@@ -0,0 +1,91 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+
+logger = logging.getLogger('ExpenseTracker')
+
+
+class ImageCache:
+    """LRU cache of images already resized for display.
+
+    Entries are keyed by (path, size, mtime), so an edited file is picked up
+    on the next lookup. With cache_dir set, resized copies are also kept on
+    disk and later runs load them instead of decoding and resampling the
+    full-size original.
+    """
+
+    def __init__(self, max_entries=16, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, size, factory=None):
+        """Return the image at path resized to size, passed through factory if given.
+
+        factory turns the PIL image into what the caller displays (a CTkImage
+        for example); its result is what gets cached.
+        """
+        mtime = os.stat(path).st_mtime_ns
+        key = (os.path.abspath(path), tuple(size), mtime, factory)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        image = self._load(key[0], key[1], mtime)
+        value = factory(image) if factory else image
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            # Drop older versions of the same image along with the LRU overflow
+            for stale in [k for k in self._entries if k[:2] == key[:2] and k[2] != mtime]:
+                del self._entries[stale]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _load(self, path, size, mtime):
+        thumbnail = self._thumbnail_path(path, size, mtime)
+        if thumbnail and os.path.exists(thumbnail):
+            try:
+                img = Image.open(thumbnail)
+                img.load()
+                return img
+            except OSError as e:
+                logger.warning(f"Ignoring unreadable image cache file {thumbnail}: {e}")
+
+        with Image.open(path) as img:
+            resized = img.resize(size)
+
+        if thumbnail:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # Write to a temporary name first so a crash never leaves a truncated thumbnail
+                partial = thumbnail + ".tmp"
+                resized.save(partial, format=Image.registered_extensions().get(os.path.splitext(thumbnail)[1], "PNG"))
+                os.replace(partial, thumbnail)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not write image cache file {thumbnail}: {e}")
+        return resized
+
+    def _thumbnail_path(self, path, size, mtime):
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha1(f"{path}|{size[0]}x{size[1]}|{mtime}".encode()).hexdigest()
+        extension = os.path.splitext(path)[1].lower() or ".png"
+        return os.path.join(self.cache_dir, f"{digest}{extension}")
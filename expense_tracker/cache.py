@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class SnapshotCache:
+    """LRU cache of per-user snapshots checked against a per-user data version.
+
+    Every write bumps the user's version, and a snapshot is served only while
+    the version it was computed at is still current and it is younger than
+    ttl seconds. Versions only see writes made through this process, so ttl
+    bounds how stale a snapshot can get when other processes write to the
+    same database.
+    """
+
+    def __init__(self, max_entries=256, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        # Bumped by clear() so loads that started before it cannot store their result
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def version(self, userid):
+        """Return the current data version of userid; read it before computing a snapshot"""
+        with self._lock:
+            return self._generation, self._versions.get(userid, 0)
+
+    def get(self, userid):
+        """Return the current snapshot of userid, or None"""
+        with self._lock:
+            entry = self._entries.get(userid)
+            if entry is not None:
+                version, stored_at, value = entry
+                current = (self._generation, self._versions.get(userid, 0))
+                if version == current and time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(userid)
+                    self.hits += 1
+                    return value
+                del self._entries[userid]
+            self.misses += 1
+            return None
+
+    def put(self, userid, version, value):
+        """Store a snapshot computed at version, unless the data changed while it was computed"""
+        with self._lock:
+            if version != (self._generation, self._versions.get(userid, 0)):
+                return
+            self._entries[userid] = (version, time.monotonic(), value)
+            self._entries.move_to_end(userid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bump(self, *userids):
+        """Record a write for each userid, invalidating their snapshots"""
+        with self._lock:
+            for userid in userids:
+                self._versions[userid] = self._versions.get(userid, 0) + 1
+                self._entries.pop(userid, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,157 @@
+from datetime import date
+
+import numpy as np
+
+from expense_tracker.dashboard import EXPENSE_CATEGORIES, INCOME_CATEGORY, summarize_category_totals
+
+
+# Day numbers count from 1970-01-01, the epoch of numpy's datetime64
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# Day number of rows stored without a parsed date; such rows never match a date filter or a month
+NO_DAY = np.iinfo(np.int32).min
+# Expense types are stored as codes into TransactionColumns.categories
+CATEGORY_CODE = np.int16
+
+
+class TransactionColumns:
+    """A user's transactions as NumPy columns for fast client-side analytics.
+
+    Amounts are int64 paise, dates int32 day numbers and expense types int16
+    codes into categories, 14 bytes per row instead of a tuple holding a
+    Decimal and two strings. Rows are kept in date order, and every
+    operation is vectorized, so totals over a million rows take
+    milliseconds.
+    """
+
+    def __init__(self, amount_paise, day, category, categories):
+        self.amount_paise = amount_paise
+        self.day = day
+        self.category = category
+        self.categories = list(categories)
+
+    @classmethod
+    def empty(cls, categories=None):
+        return cls(
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int32),
+            np.empty(0, dtype=CATEGORY_CODE),
+            categories or EXPENSE_CATEGORIES + [INCOME_CATEGORY],
+        )
+
+    @classmethod
+    def from_chunks(cls, chunks, categories=None):
+        """Build from chunks of (date, txn_date, amount, expense_type, comment) rows.
+
+        This is the shape produced by Storage.stream_transactions, so the full
+        list of row tuples never has to exist at once.
+        """
+        columns = cls.empty(categories)
+        codes = {name: code for code, name in enumerate(columns.categories)}
+        amounts, days, categories_parts = [], [], []
+
+        for rows in chunks:
+            amount = np.fromiter((float(row[2] or 0) for row in rows), dtype=np.float64, count=len(rows))
+            amounts.append(np.rint(amount * 100).astype(np.int64))
+            days.append(np.fromiter(
+                (row[1].toordinal() - EPOCH_ORDINAL if row[1] else NO_DAY for row in rows),
+                dtype=np.int32, count=len(rows),
+            ))
+            for name in {row[3] for row in rows} - codes.keys():
+                codes[name] = len(columns.categories)
+                columns.categories.append(name)
+            if len(columns.categories) > np.iinfo(CATEGORY_CODE).max + 1:
+                raise ValueError(f"Too many transaction types for {np.dtype(CATEGORY_CODE).name} codes")
+            categories_parts.append(np.fromiter((codes[row[3]] for row in rows), dtype=CATEGORY_CODE, count=len(rows)))
+
+        if amounts:
+            columns.amount_paise = np.concatenate(amounts)
+            columns.day = np.concatenate(days)
+            columns.category = np.concatenate(categories_parts)
+            columns._sort_by_day()
+        return columns
+
+    def _sort_by_day(self):
+        if len(self.day) > 1 and np.any(self.day[1:] < self.day[:-1]):
+            order = np.argsort(self.day, kind="stable")
+            self.amount_paise = self.amount_paise[order]
+            self.day = self.day[order]
+            self.category = self.category[order]
+
+    def __len__(self):
+        return len(self.amount_paise)
+
+    @property
+    def nbytes(self):
+        return self.amount_paise.nbytes + self.day.nbytes + self.category.nbytes
+
+    def dates(self):
+        """Return the day column as datetime64[D]; rows without a date are NaT"""
+        dates = self.day.astype("datetime64[D]")
+        dates[self.day == NO_DAY] = np.datetime64("NaT")
+        return dates
+
+    def _codes(self, names):
+        return [self.categories.index(name) for name in names if name in self.categories]
+
+    def filter(self, start=None, end=None, categories=None, min_amount=None, max_amount=None):
+        """Return the rows within [start, end] dates, of the given types and amount range (in rupees)"""
+        mask = np.ones(len(self), dtype=bool)
+        if start is not None:
+            mask &= self.day >= start.toordinal() - EPOCH_ORDINAL
+        if end is not None:
+            mask &= (self.day <= end.toordinal() - EPOCH_ORDINAL) & (self.day != NO_DAY)
+        if categories is not None:
+            mask &= np.isin(self.category, self._codes(categories))
+        if min_amount is not None:
+            mask &= self.amount_paise >= round(min_amount * 100)
+        if max_amount is not None:
+            mask &= self.amount_paise <= round(max_amount * 100)
+        return TransactionColumns(self.amount_paise[mask], self.day[mask], self.category[mask], self.categories)
+
+    def _sum_by(self, keys, size, mask=None):
+        # float64 sums of whole paise are exact below 2**53 paise, far beyond any personal ledger
+        amounts = self.amount_paise if mask is None else self.amount_paise[mask]
+        return np.rint(np.bincount(keys, weights=amounts, minlength=size)).astype(np.int64)
+
+    def totals_by_category(self):
+        """Return {expense_type: (total paise, count)}"""
+        category = self.category.astype(np.intp)
+        counts = np.bincount(category, minlength=len(self.categories))
+        totals = self._sum_by(category, len(self.categories))
+        return {name: (int(totals[code]), int(counts[code])) for code, name in enumerate(self.categories)}
+
+    def dashboard_totals(self):
+        """Return the same totals as ExpenseService.dashboard_totals, computed from the columns"""
+        return summarize_category_totals(
+            [(name, total / 100, count) for name, (total, count) in self.totals_by_category().items()],
+            [name for name in self.categories if name != INCOME_CATEGORY],
+        )
+
+    def totals_by_month(self):
+        """Return (months as datetime64[M], paise array shaped months x categories)"""
+        dated = None if len(self) == 0 or self.day[0] != NO_DAY else self.day != NO_DAY
+        days = self.day if dated is None else self.day[dated]
+        width = len(self.categories)
+        if len(days) == 0:
+            return np.empty(0, dtype="datetime64[M]"), np.zeros((0, width), dtype=np.int64)
+
+        # Rows are in date order, so only the first row of each day needs converting to a month
+        day_starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        day_month = days[day_starts].astype("datetime64[D]").astype("datetime64[M]")
+        new_month = np.r_[True, day_month[1:] != day_month[:-1]]
+        month_index = np.repeat(np.cumsum(new_month) - 1, np.diff(np.r_[day_starts, len(days)]))
+
+        category = self.category if dated is None else self.category[dated]
+        keys = month_index * width + category
+        totals = self._sum_by(keys, int(new_month.sum()) * width, dated).reshape(-1, width)
+        return day_month[new_month], totals
+
+    def signed_paise(self):
+        """Return amounts with income positive and expenses negative"""
+        if INCOME_CATEGORY not in self.categories:
+            return -self.amount_paise
+        return np.where(self.category == self.categories.index(INCOME_CATEGORY), self.amount_paise, -self.amount_paise)
+
+    def running_balance(self):
+        """Return the balance in paise after each row, in date order"""
+        return np.cumsum(self.signed_paise())
@@ -0,0 +1,417 @@
+import calendar
+import logging
+import math
+import os
+import threading
+import time
+import weakref
+from datetime import datetime
+
+from expense_tracker.cache import SnapshotCache
+from expense_tracker.dashboard import INCOME_CATEGORY, summarize_category_totals
+from expense_tracker.perf import profiler
+from expense_tracker.storage import BUILTIN_CATEGORY_IDS, create_storage
+from expense_tracker.transfer import TransactionExporter, TransactionImporter
+from expense_tracker.validation import InputValidator
+from expense_tracker.write_behind import WriteBehindQueue
+
+
+logger = logging.getLogger('ExpenseTracker')
+
+# Rows fetched per history page
+HISTORY_PAGE_SIZE = 100
+
+# Seconds between reconnect attempts grows up to this after repeated failures
+DB_RECONNECT_MAX_DELAY = 30
+
+# Users whose dashboard totals are cached, and seconds before a cached snapshot is recomputed anyway
+DASHBOARD_CACHE_SIZE = 256
+DASHBOARD_CACHE_TTL = 60
+
+# Rows fetched per round trip when loading transactions into columns
+COLUMNS_CHUNK_SIZE = 10000
+
+# Custom expense categories a user may create, keeping category codes well within TransactionColumns' int16
+MAX_CUSTOM_CATEGORIES = 100
+
+
+class BalanceLedger:
+    """Per-session category totals, loaded once and updated with each insert.
+
+    Totals may be loaded from a worker thread while inserts are applied on
+    the UI thread, so every change bumps a version and a load that raced
+    with a change is returned without being cached.
+    """
+
+    def __init__(self, service, userid):
+        self.service = service
+        self.userid = userid
+        self._totals = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self):
+        return self._totals is not None
+
+    def totals(self):
+        """Return the cached totals, loading them from the database if needed"""
+        with self._lock:
+            if self._totals is not None:
+                return self._totals
+            version = self._version
+
+        totals = self.service.dashboard_totals(self.userid)
+        with self._lock:
+            if self._version == version:
+                self._totals = totals
+                logger.info(f"Ledger loaded for user: {self.userid}")
+        return totals
+
+    def apply(self, expense_type, amount):
+        """Add one committed transaction to the cached totals"""
+        with self._lock:
+            self._version += 1
+            if self._totals is None:
+                return
+            if expense_type != INCOME_CATEGORY and expense_type not in self._totals["categories"]:
+                # A category created elsewhere after the totals were loaded; reload them on the next read
+                self._totals = None
+                return
+            amount = float(amount)
+            self._totals["count"] += 1
+            if expense_type == INCOME_CATEGORY:
+                self._totals["income"] += amount
+            else:
+                self._totals["categories"][expense_type] += amount
+                self._totals["total_expense"] += amount
+
+    def invalidate(self):
+        """Drop the cached totals so the next read goes back to the database"""
+        with self._lock:
+            self._version += 1
+            self._totals = None
+
+
+class ExpenseService:
+    """The expense tracker without a user interface.
+
+    Creating a service has no side effects: storage is opened by connect()
+    (or the first require_connection()) and released by close(). The Tk
+    app, the benchmarks and batch jobs all go through this class, and each
+    process of a multi-process job creates its own.
+    """
+
+    def __init__(self, backend=None, write_behind=False, write_behind_max_rows=500,
+                 write_behind_max_delay_ms=50, reconnect_max_delay=DB_RECONNECT_MAX_DELAY,
+                 dashboard_cache_size=DASHBOARD_CACHE_SIZE, dashboard_cache_ttl=DASHBOARD_CACHE_TTL):
+        self.backend = backend
+        self.write_behind = write_behind
+        self.write_behind_max_rows = write_behind_max_rows
+        self.write_behind_max_delay_ms = write_behind_max_delay_ms
+        self.reconnect_max_delay = reconnect_max_delay
+        self.storage = None
+        self.write_queue = None
+        self._reconnect_delay = 0
+        self._next_reconnect_at = 0.0
+        self._lock = threading.Lock()
+        self.dashboard_cache = SnapshotCache(dashboard_cache_size, dashboard_cache_ttl)
+        # userid -> {category name: id}, loaded on first use
+        self._categories = {}
+        # Ledgers of the active sessions, invalidated whenever the connection is recreated
+        self._ledgers = weakref.WeakSet()
+
+    @classmethod
+    def from_env(cls):
+        """Create a service configured by STORAGE_BACKEND and the WRITE_BEHIND settings"""
+        return cls(
+            backend=os.getenv("STORAGE_BACKEND"),
+            write_behind=os.getenv("WRITE_BEHIND", "0") == "1",
+            write_behind_max_rows=int(os.getenv("WRITE_BEHIND_MAX_ROWS", "500")),
+            write_behind_max_delay_ms=int(os.getenv("WRITE_BEHIND_MAX_DELAY_MS", "50")),
+            dashboard_cache_size=int(os.getenv("DASHBOARD_CACHE_SIZE", DASHBOARD_CACHE_SIZE)),
+            dashboard_cache_ttl=float(os.getenv("DASHBOARD_CACHE_TTL", DASHBOARD_CACHE_TTL)),
+        )
+
+    # Connection lifecycle
+
+    @profiler.timed("ensure_connection")
+    def connect(self):
+        """Make sure storage is open, retrying with exponential backoff after failures"""
+        with self._lock:
+            if self.storage:
+                return True
+            if time.monotonic() < self._next_reconnect_at:
+                return False
+
+            self.storage = self._open_storage()
+            if not self.storage:
+                self._reconnect_delay = min(max(self._reconnect_delay * 2, 1), self.reconnect_max_delay)
+                self._next_reconnect_at = time.monotonic() + self._reconnect_delay
+                logger.warning(f"Database unavailable, next reconnect attempt in {self._reconnect_delay}s")
+                return False
+
+            if self.write_behind:
+                self.write_queue = WriteBehindQueue(self.storage, self.write_behind_max_rows, self.write_behind_max_delay_ms)
+            self._reconnect_delay = 0
+        logger.info("Database connection established")
+        self.invalidate_caches()
+        return True
+
+    def require_connection(self):
+        """Raise ConnectionError if the database cannot be reached; for use in background tasks"""
+        if not self.connect():
+            raise ConnectionError("Database connection is not available")
+
+    def close(self):
+        """Flush queued inserts and close the storage connections"""
+        with self._lock:
+            try:
+                if self.write_queue:
+                    self.write_queue.close()
+                    self.write_queue = None
+                if self.storage:
+                    self.storage.close()
+                    self.storage = None
+                    logger.info("Database connections closed properly")
+            except Exception as e:
+                logger.error(f"Error closing database connections: {e}")
+
+    def _open_storage(self):
+        try:
+            logger.info("Attempting to connect to database...")
+            backend = create_storage(self.backend, on_reconnect=self.invalidate_caches)
+            backend.initialize()
+            return backend
+        except Exception as e:
+            logger.error(f"Error connecting to database: {e}")
+            return None
+
+    # Users
+
+    def authenticate(self, userid, password):
+        """Return True and record the login if userid exists and password matches"""
+        self.require_connection()
+        logger.info(f"Attempting login for user: {userid}")
+        stored = self.storage.get_password(userid)
+        if stored is None:
+            logger.warning(f"No user found with ID: {userid}")
+            return False
+        logger.info("User found in database")
+        if stored != password:
+            logger.warning("Password mismatch for user")
+            return False
+        logger.info("Password matches, login successful")
+        self.storage.record_login(userid)
+        return True
+
+    def create_user(self, userid, password, user_name):
+        """Create an account; returns False if the user ID is taken and raises ValueError for invalid input"""
+        for valid, message in (
+            InputValidator.validate_userid(userid),
+            InputValidator.validate_password(password),
+            (bool(user_name), "Name is required"),
+        ):
+            if not valid:
+                raise ValueError(message)
+        self.require_connection()
+        return self.storage.create_user(userid, password, user_name)
+
+    # Categories
+
+    def categories(self, userid):
+        """Return {name: category id} of the categories available to userid, built-in ones first"""
+        categories = self._categories.get(userid)
+        if categories is None:
+            self.require_connection()
+            categories = {name: category_id for category_id, name in self.storage.categories(userid)}
+            self._categories[userid] = categories
+        return categories
+
+    def expense_categories(self, userid):
+        """Return the names of userid's expense categories: the built-in ones, then their own"""
+        return [name for name in self.categories(userid) if name != INCOME_CATEGORY]
+
+    def category_id(self, userid, name):
+        """Return the id of one of userid's categories, raising ValueError if there is none"""
+        category_id = self.categories(userid).get(name)
+        if category_id is None:
+            # Another client may have added it since the categories were loaded
+            self._categories.pop(userid, None)
+            category_id = self.categories(userid).get(name)
+        if category_id is None:
+            raise ValueError(f"Unknown transaction type: {name}")
+        return category_id
+
+    def create_category(self, userid, name):
+        """Add a custom expense category; returns its id, or None if userid already has one of that name"""
+        valid, result = InputValidator.validate_category_name(name)
+        if not valid:
+            raise ValueError(result)
+        self.require_connection()
+        # Count from the database, since other clients may have added categories since they were loaded
+        self._categories.pop(userid, None)
+        if len(self.categories(userid)) - len(BUILTIN_CATEGORY_IDS) >= MAX_CUSTOM_CATEGORIES:
+            raise ValueError(f"At most {MAX_CUSTOM_CATEGORIES} custom categories can be added")
+        category_id = self.storage.create_category(userid, result)
+        if category_id is None:
+            return None
+        logger.info(f"Category {result!r} added for user: {userid}")
+        self._categories.pop(userid, None)
+        # The new category shows up in the dashboard totals with nothing spent yet
+        self.dashboard_cache.bump(userid)
+        for ledger in list(self._ledgers):
+            if ledger.userid == userid:
+                ledger.invalidate()
+        return category_id
+
+    # Transactions
+
+    def add_transaction(self, userid, amount, expense_type, date_text, comment=""):
+        """Validate and store one transaction; returns the stored row.
+
+        amount may be a number or text and date_text is dd/mm/yyyy. With
+        write-behind enabled this waits for the group commit, so a returned
+        row is always durable.
+        """
+        row = self.validate_transaction(userid, amount, expense_type, date_text, comment)
+        self.require_connection()
+        with profiler.span("submit_expense.insert"):
+            if self.write_queue:
+                # No timeout: the writer resolves every Future, and giving up early would report
+                # a failure for a row that still commits without invalidating the user's totals
+                self.write_queue.submit(row).result()
+            else:
+                self.storage.add_transactions([row])
+        self.dashboard_cache.bump(userid)
+        return row
+
+    def validate_transaction(self, userid, amount, expense_type, date_text, comment=""):
+        """Return the storage row for a transaction, raising ValueError for invalid input"""
+        # JSON clients can send null, lists or booleans, which the validators would reject with TypeError
+        if isinstance(amount, bool) or not isinstance(amount, (str, int, float)):
+            raise ValueError("Amount must be a valid number")
+        if not isinstance(date_text, str):
+            raise ValueError("Invalid date format. Please use dd/mm/yyyy")
+        if not isinstance(expense_type, str):
+            raise ValueError("Transaction type must be a category name")
+        if not isinstance(comment or "", str):
+            raise ValueError("Comment must be text")
+        valid, result = InputValidator.validate_amount(amount)
+        if not valid:
+            raise ValueError(result)
+        if not math.isfinite(result) or result > InputValidator.MAX_AMOUNT:
+            raise ValueError("Amount must be a valid number")
+        amount = result
+        valid, result = InputValidator.validate_date(date_text)
+        if not valid:
+            raise ValueError(result)
+        category_id = self.category_id(userid, expense_type)
+        return (userid, date_text, result.date(), category_id, amount, comment or "")
+
+    def add_transactions(self, rows):
+        """Store already validated (userid, date, txn_date, category_id, amount, comment) rows in one transaction"""
+        self.require_connection()
+        try:
+            self.storage.add_transactions(rows)
+        finally:
+            self.dashboard_cache.bump(*{row[0] for row in rows})
+
+    def importer(self, userid, **options):
+        self.require_connection()
+        # Batches go through add_transactions so each one invalidates the user's dashboard snapshot
+        return TransactionImporter(self, userid, categories=self.categories(userid), **options)
+
+    def exporter(self, userid, **options):
+        self.require_connection()
+        return TransactionExporter(self.storage, userid, **options)
+
+    # Dashboard and history
+
+    def ledger(self, userid):
+        """Return a BalanceLedger for userid that is invalidated on reconnect"""
+        ledger = BalanceLedger(self, userid)
+        self._ledgers.add(ledger)
+        return ledger
+
+    def invalidate_caches(self):
+        """Forget every cached total; used when the connection is recreated"""
+        self._categories.clear()
+        self.dashboard_cache.clear()
+        for ledger in list(self._ledgers):
+            ledger.invalidate()
+
+    def dashboard_totals(self, userid):
+        """Return category totals for a user, served from the snapshot cache while the user's data is unchanged"""
+        version = self.dashboard_cache.version(userid)
+        totals = self.dashboard_cache.get(userid)
+        if totals is None:
+            totals = self._query_dashboard_totals(userid)
+            self.dashboard_cache.put(userid, version, totals)
+        # Callers such as BalanceLedger update their totals in place, so never hand out the cached dict
+        return {**totals, "categories": dict(totals["categories"])}
+
+    @profiler.timed("dashboard.query")
+    def _query_dashboard_totals(self, userid):
+        self.require_connection()
+        rows = self.storage.category_totals(userid)
+        names = self._category_names(userid, {row[0] for row in rows})
+        return summarize_category_totals(
+            [(names.get(category_id), total, count) for category_id, total, count in rows],
+            self.expense_categories(userid),
+        )
+
+    def _category_names(self, userid, ids):
+        """Return {category id: name} for userid, reloading the categories if ids has one not seen yet"""
+        names = {category_id: name for name, category_id in self.categories(userid).items()}
+        if not ids.issubset(names):
+            self._categories.pop(userid, None)
+            names = {category_id: name for name, category_id in self.categories(userid).items()}
+        return names
+
+    @profiler.timed("trend.query")
+    def monthly_trend(self, userid, months=12):
+        """Return (month labels, {expense_type: totals per month}) for the last months from the rollup"""
+        today = datetime.now()
+        month_keys = []
+        year, month = today.year, today.month
+        for _ in range(months):
+            month_keys.append(f"{year:04d}-{month:02d}")
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        month_keys.reverse()
+
+        self.require_connection()
+        rows = self.storage.monthly_totals(userid, month_keys[0])
+        names = self._category_names(userid, {row[1] for row in rows})
+
+        positions = {key: i for i, key in enumerate(month_keys)}
+        series = {name: [0.0] * months for name in self.expense_categories(userid) + [INCOME_CATEGORY]}
+        for year_month, category_id, total in rows:
+            expense_type = names.get(category_id)
+            if year_month in positions and expense_type in series:
+                series[expense_type][positions[year_month]] = float(total)
+
+        labels = [calendar.month_abbr[int(key[5:])] + " " + key[2:4] for key in month_keys]
+        return labels, series
+
+    @profiler.timed("columns.load")
+    def transaction_columns(self, userid, chunk_size=COLUMNS_CHUNK_SIZE):
+        """Load all of a user's transactions into a TransactionColumns for client-side analytics"""
+        from expense_tracker.columnar import TransactionColumns
+
+        self.require_connection()
+        return TransactionColumns.from_chunks(self.storage.stream_transactions(userid, chunk_size), list(self.categories(userid)))
+
+    @profiler.timed("history.query")
+    def history_page(self, userid, sort="Newest first", after=None, limit=HISTORY_PAGE_SIZE):
+        """Return one page of a user's transactions using keyset pagination.
+
+        Returns (rows, next_key); pass next_key back as after to get the next page.
+        Rows are (id, date, txn_date, expense_type, amount, comment) tuples.
+        """
+        self.require_connection()
+        return self.storage.history_page(userid, sort, after, limit)
+
+    def rebuild_monthly_rollup(self, userid=None):
+        self.require_connection()
+        self.storage.rebuild_monthly_rollup(userid)
@@ -0,0 +1,167 @@
+import math
+
+
+# Built-in categories every user has; users can add their own expense categories
+EXPENSE_CATEGORIES = ["Food & Dining", "Transportation", "Housing", "Entertainment", "Other"]
+INCOME_CATEGORY = "Income"
+
+
+def summarize_category_totals(rows, expense_categories=None):
+    """Turn (expense_type, total, count) rows into the dashboard totals.
+
+    expense_categories lists the user's expense categories, built-in and
+    custom; it defaults to the built-in ones.
+    """
+    categories = {name: 0.0 for name in expense_categories or EXPENSE_CATEGORIES}
+    income = 0.0
+    total_expense = 0.0
+    count = 0
+
+    for expense_type, total, row_count in rows:
+        count += int(row_count)
+        amount = float(total or 0)
+        if expense_type == INCOME_CATEGORY:
+            income += amount
+        elif expense_type in categories:
+            categories[expense_type] += amount
+            total_expense += amount
+
+    return {
+        "categories": categories,
+        "income": income,
+        "total_expense": total_expense,
+        "count": count,
+    }
+
+
+def fold_custom_categories(values):
+    """Return {built-in category: value}, adding the values of custom categories to Other"""
+    folded = {name: values.get(name, 0) for name in EXPENSE_CATEGORIES}
+    folded["Other"] += sum(value for name, value in values.items() if name not in folded and name != INCOME_CATEGORY)
+    return folded
+
+
+class DashboardFigure:
+    """Expense pie chart and income/expense bar chart drawn on one persistent figure.
+
+    The figure and artists are created once; update() only changes their
+    data. The figure is not tied to a canvas, so it can be drawn by Tk or
+    rendered off-screen.
+    """
+
+    PIE_COLORS = ["#F1C40F", "#2ECC71", "#E74C3C", "#3498DB", "#9B59B6"]
+    EXPLODE = 0.05
+
+    def __init__(self):
+        from matplotlib.figure import Figure
+        from matplotlib.patches import Wedge
+
+        self.figure = Figure(figsize=(12, 5))
+        self.figure.patch.set_facecolor('#FFFFFF')
+        self.figure.subplots_adjust(left=0.05, right=0.97, bottom=0.25, top=0.85, wspace=0.35)
+
+        # Pie chart: one wedge, label and value text per expense category
+        self.pie_ax = self.figure.add_subplot(121)
+        self.pie_ax.set_facecolor('#FFFFFF')
+        self.pie_ax.set_aspect('equal')
+        self.pie_ax.set_frame_on(False)
+        self.pie_ax.set_xticks([])
+        self.pie_ax.set_yticks([])
+        self.pie_ax.set_xlim(-1.25, 1.25)
+        self.pie_ax.set_ylim(-1.25, 1.25)
+        self.pie_ax.set_title("Expense Distribution", pad=20, fontsize=12, fontweight='bold')
+
+        self.wedges = []
+        self.wedge_labels = []
+        self.wedge_values = []
+        for _ in EXPENSE_CATEGORIES:
+            wedge = Wedge((0, 0), 1, 0, 0, visible=False)
+            self.pie_ax.add_patch(wedge)
+            self.wedges.append(wedge)
+            self.wedge_labels.append(self.pie_ax.text(0, 0, "", size=8, va="center", visible=False))
+            self.wedge_values.append(self.pie_ax.text(0, 0, "", size=8, weight="bold", ha="center", va="center", visible=False))
+
+        # Bar chart: one bar per category plus income
+        self.bar_ax = self.figure.add_subplot(122)
+        self.bar_ax.set_facecolor('#FFFFFF')
+        self.bar_ax.set_title("Income vs Expenses", pad=20, fontsize=12, fontweight='bold')
+        self.bar_ax.set_xlabel("Categories", labelpad=10)
+        self.bar_ax.set_ylabel("Amount (₹)", labelpad=10)
+
+        self.bar_names = EXPENSE_CATEGORIES + [INCOME_CATEGORY]
+        self.bars = self.bar_ax.bar(
+            range(len(self.bar_names)),
+            [0] * len(self.bar_names),
+            color=["#2ECC71" if name == INCOME_CATEGORY else "#E74C3C" for name in self.bar_names]
+        )
+        self.bar_labels = [
+            self.bar_ax.text(0, 0, "", ha='center', va='bottom', fontsize=8, visible=False)
+            for _ in self.bar_names
+        ]
+
+    def update(self, categories, income, total_expense):
+        """Update the chart data in place; the caller schedules the redraw"""
+        # Custom categories are drawn as part of "Other" so the charts keep a fixed set of artists
+        categories = fold_custom_categories(categories)
+        self._update_pie(categories, total_expense)
+        self._update_bars(categories, income)
+
+    def _update_pie(self, categories, total_expense):
+        shown = [(name, value) for name, value in categories.items() if value > 0]
+        total = sum(value for _, value in shown)
+        self.pie_ax.set_visible(total_expense > 0 and total > 0)
+
+        theta1 = 90.0
+        for i, (wedge, label, value_text) in enumerate(zip(self.wedges, self.wedge_labels, self.wedge_values)):
+            if i >= len(shown):
+                for artist in (wedge, label, value_text):
+                    artist.set_visible(False)
+                continue
+
+            name, value = shown[i]
+            fraction = value / total
+            theta2 = theta1 + 360.0 * fraction
+            middle = math.radians((theta1 + theta2) / 2)
+            center_x = self.EXPLODE * math.cos(middle)
+            center_y = self.EXPLODE * math.sin(middle)
+
+            wedge.set_center((center_x, center_y))
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+            wedge.set_facecolor(self.PIE_COLORS[i])
+
+            label_x = center_x + 1.1 * math.cos(middle)
+            label.set_position((label_x, center_y + 1.1 * math.sin(middle)))
+            label.set_horizontalalignment('left' if label_x > 0 else 'right')
+            label.set_text(name)
+
+            pct = fraction * 100
+            value_text.set_position((center_x + 0.6 * math.cos(middle), center_y + 0.6 * math.sin(middle)))
+            value_text.set_text(f'₹{int(pct/100.*total):,}\n({pct:.1f}%)')
+
+            for artist in (wedge, label, value_text):
+                artist.set_visible(True)
+            theta1 = theta2
+
+    def _update_bars(self, categories, income):
+        values = [categories.get(name, 0) for name in EXPENSE_CATEGORIES] + [income]
+        shown = []
+        for bar, label, name, value in zip(self.bars, self.bar_labels, self.bar_names, values):
+            if value <= 0:
+                bar.set_visible(False)
+                label.set_visible(False)
+                continue
+
+            position = len(shown)
+            bar.set_x(position - bar.get_width() / 2)
+            bar.set_height(value)
+            bar.set_visible(True)
+            label.set_position((position, value))
+            label.set_text(f'₹{int(value):,}')
+            label.set_visible(True)
+            shown.append((name, value))
+
+        self.bar_ax.set_xticks(range(len(shown)))
+        self.bar_ax.set_xticklabels([name for name, _ in shown], rotation=30, ha='right')
+        self.bar_ax.set_xlim(-0.5, max(len(shown), 1) - 0.5)
+        self.bar_ax.set_ylim(0, max((value for _, value in shown), default=1) * 1.15)
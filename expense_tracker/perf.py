@@ -0,0 +1,94 @@
+import contextlib
+import functools
+import json
+import threading
+import time
+from collections import deque
+
+
+class Profiler:
+    """Rolling timings for named spans of the hot paths.
+
+    Each span name keeps its last window durations, from which stats()
+    reports p50/p95/p99. While disabled, span() hands back a shared no-op
+    context manager and timed() functions make a single flag check, so the
+    instrumentation can stay in place permanently.
+    """
+
+    def __init__(self, enabled=False, window=1000):
+        self.enabled = enabled
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._null_span = contextlib.nullcontext()
+
+    def record(self, name, seconds):
+        """Add one duration for name"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def span(self, name):
+        """Context manager timing its block as name"""
+        if not self.enabled:
+            return self._null_span
+        return self._span(name)
+
+    @contextlib.contextmanager
+    def _span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def timed(self, name):
+        """Decorator timing every call of the function as name"""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def stats(self):
+        """Return {name: {count, p50_ms, p95_ms, p99_ms, max_ms}} over each rolling window"""
+        with self._lock:
+            snapshot = {name: (sorted(samples), self._counts[name]) for name, samples in self._samples.items()}
+
+        result = {}
+        for name, (samples, count) in sorted(snapshot.items()):
+            def percentile(p):
+                return round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 3)
+            result[name] = {
+                "count": count,
+                "p50_ms": percentile(0.50),
+                "p95_ms": percentile(0.95),
+                "p99_ms": percentile(0.99),
+                "max_ms": round(samples[-1] * 1000, 3),
+            }
+        return result
+
+    def dump(self, path):
+        """Write stats() to path as JSON"""
+        with open(path, "w") as f:
+            json.dump(self.stats(), f, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+# Shared by the core and the app; the app turns it on with PERF_TRACE
+profiler = Profiler()
@@ -0,0 +1,442 @@
+"""Serve the expense tracker to several clients over HTTP/JSON.
+
+Usage:
+    python -m expense_tracker.server [--host 127.0.0.1] [--port 8765] [--backend sqlite]
+
+Clients log in with POST /login and send the returned token as
+"Authorization: Bearer <token>" on every other request:
+
+    POST /login               {"userid", "password"} -> {"token", "userid"}
+    POST /logout
+    GET  /categories          -> {"categories": [names]}
+    POST /categories          {"name"} -> {"id", "name"}
+    POST /transactions        {"amount", "type", "date", "comment"} -> {"transaction"}
+    POST /transactions/bulk   {"transactions": [...]} -> {"added", "errors"}
+    GET  /dashboard           -> category totals
+    GET  /history?sort=&limit=&after= -> {"rows", "next"}
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import functools
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from urllib.parse import parse_qs, urlsplit
+
+from expense_tracker.core import HISTORY_PAGE_SIZE, ExpenseService
+from expense_tracker.storage import HISTORY_SORTS
+
+
+logger = logging.getLogger('ExpenseTracker')
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+# Threads running database calls; keep it at DB_POOL_SIZE so requests queue here rather than on the pool
+SERVER_WORKERS = 5
+SESSION_TTL_SECONDS = 8 * 60 * 60
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_BULK_ROWS = 10000
+HISTORY_MAX_LIMIT = 1000
+
+STATUS_TEXT = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+Request = namedtuple("Request", "method path query headers body")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class SessionStore:
+    """Bearer tokens of logged-in users, dropped after ttl seconds without use"""
+
+    def __init__(self, ttl=SESSION_TTL_SECONDS):
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, userid):
+        token = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self._lock:
+            # Prune on login so abandoned sessions cannot pile up
+            for stale in [t for t, (_, expires) in self._sessions.items() if expires <= now]:
+                del self._sessions[stale]
+            self._sessions[token] = (userid, now + self.ttl)
+        return token
+
+    def userid(self, token):
+        """Return the user of a live token and extend its lifetime, or None"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            userid, expires = session
+            if expires <= now:
+                del self._sessions[token]
+                return None
+            self._sessions[token] = (userid, now + self.ttl)
+            return userid
+
+    def revoke(self, token):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _transaction_json(row, expense_type):
+    userid, date_text, txn_date, category_id, amount, comment = row
+    return {"userid": userid, "date": date_text, "txn_date": txn_date, "type": expense_type,
+            "category_id": category_id, "amount": amount, "comment": comment}
+
+
+def _history_json(row):
+    txn_id, date_text, txn_date, expense_type, amount, comment = row
+    return {"id": txn_id, "date": date_text, "txn_date": txn_date,
+            "type": expense_type, "amount": amount, "comment": comment}
+
+
+def _encode_cursor(key):
+    """Turn a history_page next_key into an opaque string for the next request"""
+    value, txn_id = key
+    raw = json.dumps([value, txn_id], default=_json_default).encode()
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor, sort):
+    try:
+        value, txn_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if HISTORY_SORTS[sort][0] == "txn_date":
+            return date.fromisoformat(value), int(txn_id)
+        return float(value), int(txn_id)
+    except (ValueError, TypeError):
+        raise HTTPError(400, "Invalid history cursor")
+
+
+class ExpenseServer:
+    """HTTP/JSON front end letting several clients share one ExpenseService.
+
+    Requests are parsed on the asyncio event loop; the blocking service
+    calls run on a thread pool no larger than the database connection pool,
+    so idle or slow clients hold no connections and every client shares the
+    service's pooled storage.
+    """
+
+    def __init__(self, service, host=SERVER_HOST, port=SERVER_PORT, workers=SERVER_WORKERS,
+                 session_ttl=SESSION_TTL_SECONDS):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.sessions = SessionStore(session_ttl)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="server")
+        self._server = None
+        self.routes = {
+            ("POST", "/login"): self.login,
+            ("POST", "/logout"): self.logout,
+            ("GET", "/categories"): self.categories,
+            ("POST", "/categories"): self.create_category,
+            ("POST", "/transactions"): self.add_transaction,
+            ("POST", "/transactions/bulk"): self.add_transactions,
+            ("GET", "/dashboard"): self.dashboard,
+            ("GET", "/history"): self.history,
+        }
+
+    async def start(self):
+        """Start listening; with port 0 the chosen port is stored in self.port"""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Expense server listening on http://{self.host}:{self.port}")
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._executor.shutdown(wait=True)
+
+    async def _run(self, func, *args):
+        """Run a blocking service call on the worker pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    # Connection handling
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    self._write_response(writer, e.status, {"error": e.message}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                status, payload = await self._dispatch(request)
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _readline(self, reader):
+        try:
+            return await reader.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            raise HTTPError(400, "Request line or header is too long")
+
+    async def _read_request(self, reader):
+        line = await self._readline(reader)
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await self._readline(reader)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, f"Request body is limited to {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b""
+
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        return Request(method.upper(), url.path, query, headers, body)
+
+    async def _dispatch(self, request):
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self.routes):
+                return 405, {"error": f"{request.method} is not allowed on {request.path}"}
+            return 404, {"error": f"No such endpoint: {request.path}"}
+        try:
+            return await handler(request)
+        except HTTPError as e:
+            return e.status, {"error": e.message}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except ConnectionError as e:
+            return 503, {"error": str(e)}
+        except Exception:
+            logger.exception(f"Error handling {request.method} {request.path}")
+            return 500, {"error": "Internal server error"}
+
+    def _write_response(self, writer, status, payload, keep_alive):
+        try:
+            # NaN and Infinity are not JSON, and clients would fail to parse them
+            body = json.dumps(payload, default=_json_default, allow_nan=False).encode()
+        except ValueError:
+            logger.exception("Response is not valid JSON")
+            status, body = 500, json.dumps({"error": "Internal server error"}).encode()
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+
+    # Request helpers
+
+    def _json(self, request):
+        if not request.body:
+            return {}
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            raise HTTPError(400, "Request body must be JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Request body must be a JSON object")
+        return data
+
+    def _token(self, request):
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        return token.strip() if scheme.lower() == "bearer" else ""
+
+    def _authenticated(self, request):
+        """Return the userid of the request's session, raising 401 without a valid token"""
+        userid = self.sessions.userid(self._token(request))
+        if userid is None:
+            raise HTTPError(401, "Login required")
+        return userid
+
+    # Endpoints
+
+    async def login(self, request):
+        data = self._json(request)
+        userid, password = data.get("userid"), data.get("password")
+        if not userid or not password:
+            raise HTTPError(400, "userid and password are required")
+        if not isinstance(userid, str) or not isinstance(password, str):
+            raise HTTPError(400, "userid and password must be strings")
+        if not await self._run(self.service.authenticate, userid, password):
+            raise HTTPError(401, "Invalid credentials")
+        return 200, {"token": self.sessions.create(userid), "userid": userid}
+
+    async def logout(self, request):
+        self.sessions.revoke(self._token(request))
+        return 200, {}
+
+    async def categories(self, request):
+        userid = self._authenticated(request)
+        categories = await self._run(self.service.categories, userid)
+        return 200, {"categories": list(categories)}
+
+    async def create_category(self, request):
+        userid = self._authenticated(request)
+        name = self._json(request).get("name")
+        if not isinstance(name, str):
+            raise HTTPError(400, "name must be a string")
+        category_id = await self._run(self.service.create_category, userid, name)
+        if category_id is None:
+            raise HTTPError(400, f"Category already exists: {name}")
+        return 201, {"id": category_id, "name": name.strip()}
+
+    async def add_transaction(self, request):
+        userid = self._authenticated(request)
+        data = self._json(request)
+        row = await self._run(
+            self.service.add_transaction,
+            userid, data.get("amount"), data.get("type"), data.get("date"), data.get("comment", ""),
+        )
+        return 201, {"transaction": _transaction_json(row, data.get("type"))}
+
+    async def add_transactions(self, request):
+        """Validate every row, store the valid ones in one transaction and report the rest by index"""
+        userid = self._authenticated(request)
+        items = self._json(request).get("transactions")
+        if not isinstance(items, list):
+            raise HTTPError(400, "transactions must be a list")
+        if len(items) > MAX_BULK_ROWS:
+            raise HTTPError(413, f"At most {MAX_BULK_ROWS} transactions per request")
+
+        def validate_and_store():
+            rows, errors = [], []
+            for index, item in enumerate(items):
+                try:
+                    if not isinstance(item, dict):
+                        raise ValueError("Each transaction must be an object")
+                    rows.append(self.service.validate_transaction(
+                        userid, item.get("amount"), item.get("type"), item.get("date"), item.get("comment", "")
+                    ))
+                except ValueError as e:
+                    errors.append({"index": index, "error": str(e)})
+            if rows:
+                self.service.add_transactions(rows)
+            return len(rows), errors
+
+        added, errors = await self._run(validate_and_store)
+        return 201, {"added": added, "errors": errors}
+
+    async def dashboard(self, request):
+        userid = self._authenticated(request)
+        return 200, await self._run(self.service.dashboard_totals, userid)
+
+    async def history(self, request):
+        userid = self._authenticated(request)
+        sort = request.query.get("sort", "Newest first")
+        if sort not in HISTORY_SORTS:
+            raise HTTPError(400, f"sort must be one of: {', '.join(HISTORY_SORTS)}")
+        try:
+            limit = int(request.query.get("limit", HISTORY_PAGE_SIZE))
+        except ValueError:
+            raise HTTPError(400, "limit must be a number")
+        if not 1 <= limit <= HISTORY_MAX_LIMIT:
+            raise HTTPError(400, f"limit must be between 1 and {HISTORY_MAX_LIMIT}")
+        after = _decode_cursor(request.query["after"], sort) if request.query.get("after") else None
+
+        rows, next_key = await self._run(self.service.history_page, userid, sort, after, limit)
+        return 200, {
+            "rows": [_history_json(row) for row in rows],
+            "next": _encode_cursor(next_key) if next_key else None,
+        }
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=os.getenv("SERVER_HOST", SERVER_HOST))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVER_PORT", SERVER_PORT)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVER_WORKERS", SERVER_WORKERS)),
+                        help="threads running database calls")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], help="defaults to STORAGE_BACKEND")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    service = ExpenseService.from_env()
+    if args.backend:
+        service.backend = args.backend
+    if not service.connect():
+        return 1
+
+    server = ExpenseServer(service, args.host, args.port, args.workers)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
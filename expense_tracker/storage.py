@@ -0,0 +1,863 @@
+import contextlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+
+import mysql.connector
+
+from expense_tracker.dashboard import EXPENSE_CATEGORIES, INCOME_CATEGORY
+
+
+logger = logging.getLogger('ExpenseTracker')
+
+# Orderings supported by history pages: label -> (column, direction)
+HISTORY_SORTS = {
+    "Newest first": ("txn_date", "DESC"),
+    "Oldest first": ("txn_date", "ASC"),
+    "Largest amount": ("amount", "DESC"),
+    "Smallest amount": ("amount", "ASC"),
+}
+
+EXPENSE_COLUMNS = "userid, date, txn_date, category_id, amount, comment"
+
+# Categories every user has, with fixed ids; custom categories are numbered after them
+BUILTIN_CATEGORY_IDS = {name: i for i, name in enumerate(EXPENSE_CATEGORIES + [INCOME_CATEGORY], start=1)}
+CATEGORY_NAME_MAX_LENGTH = 64
+
+
+class Storage:
+    """SQL shared by every storage backend.
+
+    Queries are written with %s placeholders; backends provide connections,
+    the schema and the few dialect-specific statements.
+    """
+
+    name = None
+    placeholder = "%s"
+    month_expr = None
+    rollup_upsert = None
+    seed_category = None
+
+    def connection(self):
+        """Context manager yielding a DB-API connection"""
+        raise NotImplementedError
+
+    def initialize(self):
+        """Create or migrate the schema"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def _sql(self, query):
+        if self.placeholder == "%s":
+            return query
+        return query.replace("%s", self.placeholder)
+
+    def _streaming_cursor(self, conn):
+        return conn.cursor()
+
+    def _discard_results(self, conn, cursor):
+        pass
+
+    # Users
+
+    def get_password(self, userid):
+        """Return the stored password for userid, or None if there is no such user"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._sql("SELECT password FROM userinfo WHERE userid = %s"), (userid,))
+            row = cursor.fetchone()
+            cursor.close()
+        return row[0] if row else None
+
+    def record_login(self, userid):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._sql("UPDATE userinfo SET last_login = CURRENT_TIMESTAMP WHERE userid = %s"), (userid,))
+            conn.commit()
+            cursor.close()
+
+    def create_user(self, userid, password, user_name):
+        """Create a user; returns False if the user ID is already taken"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._sql("SELECT userid FROM userinfo WHERE userid = %s"), (userid,))
+            if cursor.fetchone() is not None:
+                cursor.close()
+                return False
+            cursor.execute(
+                self._sql("INSERT INTO userinfo (userid, password, user_name) VALUES (%s, %s, %s)"),
+                (userid, password, user_name)
+            )
+            conn.commit()
+            cursor.close()
+        return True
+
+    # Categories
+
+    def categories(self, userid):
+        """Return the (id, name) categories available to userid: the built-in ones, then their own"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                self._sql("SELECT id, name FROM category WHERE userid IS NULL OR userid = %s ORDER BY id"),
+                (userid,)
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+        return rows
+
+    def create_category(self, userid, name):
+        """Add a custom expense category for userid; returns its id, or None if the name is taken"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                self._sql("SELECT id FROM category WHERE name = %s AND (userid IS NULL OR userid = %s)"),
+                (name, userid)
+            )
+            if cursor.fetchone() is not None:
+                cursor.close()
+                return None
+            cursor.execute(self._sql("INSERT INTO category (userid, name) VALUES (%s, %s)"), (userid, name))
+            category_id = cursor.lastrowid
+            conn.commit()
+            cursor.close()
+        return category_id
+
+    def _seed_categories(self, cursor):
+        cursor.executemany(
+            self._sql(self.seed_category),
+            [(category_id, name) for name, category_id in BUILTIN_CATEGORY_IDS.items()]
+        )
+
+    # Transactions
+
+    def add_transaction(self, userid, date_text, txn_date, category_id, amount, comment):
+        self.add_transactions([(userid, date_text, txn_date, category_id, amount, comment)])
+
+    def add_transactions(self, rows):
+        """Insert (userid, date, txn_date, category_id, amount, comment) rows and
+        their monthly rollup deltas in one transaction"""
+        if not rows:
+            return
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                self._sql(f"INSERT INTO expense ({EXPENSE_COLUMNS}) VALUES (%s, %s, %s, %s, %s, %s)"),
+                self._insert_params(rows)
+            )
+            self._apply_rollup_deltas(cursor, rows)
+            conn.commit()
+            cursor.close()
+
+    def _insert_params(self, rows):
+        """Return expense rows in the form the driver binds"""
+        return rows
+
+    def _apply_rollup_deltas(self, cursor, rows):
+        deltas = {}
+        for userid, _, txn_date, category_id, amount, _ in rows:
+            key = (userid, txn_date.strftime("%Y-%m"), category_id)
+            total, count = deltas.get(key, (0, 0))
+            deltas[key] = (total + amount, count + 1)
+
+        cursor.executemany(
+            self._sql(self.rollup_upsert),
+            [key + (total, count) for key, (total, count) in deltas.items()]
+        )
+
+    def category_totals(self, userid):
+        """Return (category_id, total, count) rows for a user"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                self._sql("SELECT category_id, SUM(amount), COUNT(*) FROM expense WHERE userid = %s GROUP BY category_id"),
+                (userid,)
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+        return rows
+
+    def history_page(self, userid, sort, after=None, limit=100):
+        """Return one keyset-paginated page of (id, date, txn_date, expense_type, amount, comment) rows.
+
+        after is the (sort value, id) key of the last row of the previous page.
+        Returns (rows, next_key); next_key is None once the history is exhausted.
+        """
+        column, direction = HISTORY_SORTS[sort]
+        op = "<" if direction == "DESC" else ">"
+
+        query = (
+            "SELECT e.id, e.date, e.txn_date, c.name, e.amount, e.comment "
+            "FROM expense e JOIN category c ON c.id = e.category_id "
+            f"WHERE e.userid = %s AND e.{column} IS NOT NULL"
+        )
+        params = [userid]
+        if after is not None:
+            query += f" AND (e.{column} {op} %s OR (e.{column} = %s AND e.id {op} %s))"
+            params += [after[0], after[0], after[1]]
+        query += f" ORDER BY e.{column} {direction}, e.id {direction} LIMIT %s"
+        params.append(limit)
+
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(query), params)
+            rows = cursor.fetchall()
+            cursor.close()
+
+        if len(rows) < limit:
+            return rows, None
+        last = rows[-1]
+        return rows, (last[2] if column == "txn_date" else last[4], last[0])
+
+    def stream_transactions(self, userid, chunk_size, cancel_event=None):
+        """Yield lists of (date, txn_date, amount, expense_type, comment) rows in date order.
+
+        Rows are fetched chunk_size at a time from a streaming cursor. The
+        generator stops early once cancel_event is set.
+        """
+        with self.connection() as conn:
+            cursor = self._streaming_cursor(conn)
+            cursor.execute(
+                self._sql(
+                    "SELECT e.date, e.txn_date, e.amount, c.name, e.comment "
+                    "FROM expense e JOIN category c ON c.id = e.category_id "
+                    "WHERE e.userid = %s ORDER BY e.txn_date, e.id"
+                ),
+                (userid,)
+            )
+            finished = False
+            try:
+                while not (cancel_event and cancel_event.is_set()):
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        finished = True
+                        break
+                    yield rows
+            finally:
+                if not finished:
+                    self._discard_results(conn, cursor)
+                cursor.close()
+
+    # Monthly rollup
+
+    def monthly_totals(self, userid, since):
+        """Return (year_month, category_id, total) rollup rows from the since month onwards"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                self._sql(
+                    "SELECT `year_month`, category_id, total FROM expense_monthly_rollup "
+                    "WHERE userid = %s AND `year_month` >= %s"
+                ),
+                (userid, since)
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+        return rows
+
+    def rebuild_monthly_rollup(self, userid=None):
+        """Recompute expense_monthly_rollup from the expense table, for one user or everyone"""
+        with self.connection() as conn:
+            self._rebuild_monthly_rollup(conn, userid)
+
+    def _rebuild_monthly_rollup(self, conn, userid=None):
+        cursor = conn.cursor()
+        where, params = "WHERE txn_date IS NOT NULL", ()
+        if userid is not None:
+            where, params = "WHERE txn_date IS NOT NULL AND userid = %s", (userid,)
+
+        logger.info(f"Rebuilding monthly rollup for {userid or 'all users'}...")
+        cursor.execute(
+            self._sql(f"DELETE FROM expense_monthly_rollup {'WHERE userid = %s' if userid is not None else ''}"),
+            params
+        )
+        month = self.month_expr.format(column="txn_date")
+        cursor.execute(
+            self._sql(
+                "INSERT INTO expense_monthly_rollup (userid, `year_month`, category_id, total, count) "
+                f"SELECT userid, {month}, category_id, SUM(amount), COUNT(*) "
+                f"FROM expense {where} GROUP BY userid, {month}, category_id"
+            ),
+            params
+        )
+        conn.commit()
+        logger.info(f"Monthly rollup rebuilt with {cursor.rowcount} rows")
+        cursor.close()
+
+    def _populate_rollup_if_empty(self, conn):
+        cursor = conn.cursor()
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM expense_monthly_rollup), EXISTS(SELECT 1 FROM expense)")
+        has_rollup, has_expenses = cursor.fetchone()
+        cursor.close()
+        if has_expenses and not has_rollup:
+            self._rebuild_monthly_rollup(conn)
+
+
+# MySQL
+
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "",
+    "port": 3306,
+}
+DB_NAME = "expense_tracker"
+DB_POOL_SIZE = 5
+DB_POOL_RECYCLE_SECONDS = 1800
+# Connections idle longer than this are pinged before reuse; busier ones go straight to the caller
+DB_POOL_PING_AFTER_SECONDS = 10
+
+# Rows converted per transaction when backfilling expense.txn_date and expense.category_id
+BACKFILL_BATCH_SIZE = 5000
+
+# Indexes added to older expense tables; idx_expense_user_category_date comes with the category migration
+EXPENSE_INDEXES = {
+    "idx_expense_user_date": "(userid, txn_date, id)",
+    "idx_expense_user_amount": "(userid, amount, id)",
+}
+
+
+class ConnectionPool:
+    """Bounded pool of MySQL connections shared by the UI and background jobs.
+
+    Checkouts block until a connection is free. A connection idle longer
+    than ping_after seconds is pinged before use, and reconnected if it was
+    dropped or sat idle longer than recycle_seconds. The pool keeps its own
+    idle connections, so close() can close them through the connector's
+    public API.
+    """
+
+    def __init__(self, size=DB_POOL_SIZE, recycle_seconds=DB_POOL_RECYCLE_SECONDS, on_reconnect=None,
+                 ping_after=DB_POOL_PING_AFTER_SECONDS, **config):
+        self.size = size
+        self.recycle_seconds = recycle_seconds
+        self.ping_after = ping_after
+        self.on_reconnect = on_reconnect
+        self.config = config
+        self._slots = threading.BoundedSemaphore(size)
+        # (connection, time it was returned) of connections not in use, most recently returned last;
+        # opened up front so bad settings fail here rather than on first use
+        self._idle = [(mysql.connector.connect(**config), time.monotonic()) for _ in range(size)]
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connection(self, timeout=10):
+        """Check out a connection for the duration of a with-block"""
+        if not self._slots.acquire(timeout=timeout):
+            raise mysql.connector.errors.PoolError("Timed out waiting for a database connection")
+        cnx = None
+        try:
+            cnx = self._checkout()
+            yield cnx
+        finally:
+            if cnx is not None:
+                self._checkin(cnx)
+            self._slots.release()
+
+    def _checkout(self):
+        with self._lock:
+            cnx, idle_since = self._idle.pop() if self._idle else (None, None)
+        if cnx is None:
+            return mysql.connector.connect(**self.config)
+
+        idle = time.monotonic() - idle_since
+        if idle > self.recycle_seconds:
+            logger.info("Recycling idle database connection")
+        elif idle <= self.ping_after or cnx.is_connected():
+            return cnx
+
+        cnx.reconnect(attempts=2, delay=1)
+        if self.on_reconnect:
+            self.on_reconnect()
+        return cnx
+
+    def _checkin(self, cnx):
+        try:
+            # One round trip that ends any open transaction, so the next user does not see an old snapshot
+            cnx.rollback()
+        except Exception:
+            # A broken connection is dropped; the next checkout opens a new one
+            with contextlib.suppress(Exception):
+                cnx.close()
+            return
+        with self._lock:
+            self._idle.append((cnx, time.monotonic()))
+
+    def close(self):
+        """Close every idle connection in the pool"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for cnx, _ in idle:
+            with contextlib.suppress(Exception):
+                cnx.close()
+
+
+class MySQLStorage(Storage):
+    """MySQL server backend using a connection pool"""
+
+    name = "mysql"
+    month_expr = "DATE_FORMAT({column}, '%Y-%m')"
+    rollup_upsert = (
+        "INSERT INTO expense_monthly_rollup (userid, `year_month`, category_id, total, count) "
+        "VALUES (%s, %s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE total = total + VALUES(total), count = count + VALUES(count)"
+    )
+    seed_category = "INSERT IGNORE INTO category (id, userid, name) VALUES (%s, NULL, %s)"
+
+    # Schemas bootstrapped by this process, so reconnects skip the DDL
+    _initialized = set()
+
+    def __init__(self, config=None, database=DB_NAME, pool_size=DB_POOL_SIZE,
+                 recycle_seconds=DB_POOL_RECYCLE_SECONDS, on_reconnect=None):
+        self.config = dict(config or DB_CONFIG)
+        self.database = database
+        self.pool_size = pool_size
+        self.recycle_seconds = recycle_seconds
+        self.on_reconnect = on_reconnect
+        self.pool = None
+
+    def connection(self):
+        return self.pool.connection()
+
+    def initialize(self):
+        key = (self.config["host"], self.config["port"], self.database)
+        try:
+            if key not in self._initialized:
+                bootstrap = mysql.connector.connect(**self.config)
+                try:
+                    cursor = bootstrap.cursor()
+                    logger.info("Creating database if it doesn't exist...")
+                    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.database}")
+                finally:
+                    bootstrap.close()
+
+            self.pool = ConnectionPool(
+                size=self.pool_size,
+                recycle_seconds=self.recycle_seconds,
+                on_reconnect=self.on_reconnect,
+                database=self.database,
+                **self.config
+            )
+
+            if key not in self._initialized:
+                with self.pool.connection() as conn:
+                    self._create_tables(conn)
+                self._initialized.add(key)
+
+            logger.info(f"Database connection pool ready ({self.pool.size} connections)")
+        except mysql.connector.Error as err:
+            if err.errno == mysql.connector.errorcode.ER_ACCESS_DENIED_ERROR:
+                logger.error("Invalid database username or password")
+            elif err.errno == mysql.connector.errorcode.ER_BAD_DB_ERROR:
+                logger.error("Database does not exist")
+            else:
+                logger.error(f"MySQL Error: {err}")
+            raise
+
+    def close(self):
+        if self.pool:
+            self.pool.close()
+
+    def _streaming_cursor(self, conn):
+        return conn.cursor(buffered=False)
+
+    def _discard_results(self, conn, cursor):
+        # Drain what is left on the wire so the connection can go back to the pool
+        with contextlib.suppress(Exception):
+            conn.consume_results()
+
+    def _create_tables(self, conn):
+        try:
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS userinfo (
+                    userid VARCHAR(255) PRIMARY KEY,
+                    password VARCHAR(255) NOT NULL,
+                    user_name VARCHAR(255) NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_login TIMESTAMP NULL DEFAULT NULL
+                )
+            """)
+
+            # Built-in categories have no userid; custom ones belong to one user
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS category (
+                    id MEDIUMINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+                    userid VARCHAR(255) NULL,
+                    name VARCHAR(64) NOT NULL,
+                    UNIQUE KEY uq_category_user_name (userid, name),
+                    FOREIGN KEY (userid) REFERENCES userinfo(userid) ON DELETE CASCADE
+                )
+            """)
+            self._seed_categories(cursor)
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS expense (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    userid VARCHAR(255) NOT NULL,
+                    date VARCHAR(20) NOT NULL,
+                    txn_date DATE NULL,
+                    category_id MEDIUMINT UNSIGNED NOT NULL,
+                    amount DECIMAL(10,2) NOT NULL,
+                    comment TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    FOREIGN KEY (userid) REFERENCES userinfo(userid) ON DELETE CASCADE,
+                    FOREIGN KEY (category_id) REFERENCES category(id),
+                    INDEX idx_expense_user_date (userid, txn_date, id),
+                    INDEX idx_expense_user_category_date (userid, category_id, txn_date, amount),
+                    INDEX idx_expense_user_amount (userid, amount, id),
+                    CHECK (amount > 0)
+                )
+            """)
+
+            conn.commit()
+
+            self._migrate_expense_dates(conn, cursor)
+            self._migrate_expense_categories(conn, cursor)
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS expense_monthly_rollup (
+                    userid VARCHAR(255) NOT NULL,
+                    `year_month` CHAR(7) NOT NULL,
+                    category_id MEDIUMINT UNSIGNED NOT NULL,
+                    total DECIMAL(14,2) NOT NULL DEFAULT 0,
+                    count INT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (userid, `year_month`, category_id),
+                    FOREIGN KEY (userid) REFERENCES userinfo(userid) ON DELETE CASCADE
+                )
+            """)
+            conn.commit()
+
+            self._populate_rollup_if_empty(conn)
+            logger.info("Database tables initialized successfully")
+        except Exception as e:
+            logger.error(f"Error creating tables: {e}")
+            raise
+
+    def _migrate_expense_dates(self, conn, cursor):
+        """Add the DATE column and indexes to older expense tables and backfill it"""
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'expense' AND COLUMN_NAME = 'txn_date'"
+        )
+        if not cursor.fetchone()[0]:
+            logger.info("Adding txn_date column to expense table...")
+            cursor.execute("ALTER TABLE expense ADD COLUMN txn_date DATE NULL AFTER date, ALGORITHM=INPLACE, LOCK=NONE")
+
+        cursor.execute(
+            "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'expense'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        for name, columns in EXPENSE_INDEXES.items():
+            if name not in existing:
+                logger.info(f"Adding index {name} to expense table...")
+                cursor.execute(f"ALTER TABLE expense ADD INDEX {name} {columns}, ALGORITHM=INPLACE, LOCK=NONE")
+
+        # Backfill in id ranges so each batch is a short transaction
+        cursor.execute("SELECT MIN(id), MAX(id) FROM expense WHERE txn_date IS NULL")
+        first_id, last_id = cursor.fetchone()
+        if first_id is None:
+            return
+
+        logger.info("Backfilling expense.txn_date from date strings...")
+        converted = 0
+        for start in range(first_id, last_id + 1, BACKFILL_BATCH_SIZE):
+            cursor.execute(
+                "UPDATE expense SET txn_date = STR_TO_DATE(date, '%d/%m/%Y') "
+                "WHERE id >= %s AND id < %s AND txn_date IS NULL "
+                "AND date REGEXP '^[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}$'",
+                (start, start + BACKFILL_BATCH_SIZE)
+            )
+            converted += cursor.rowcount
+            conn.commit()
+        logger.info(f"Backfilled txn_date for {converted} rows")
+
+    def _migrate_expense_categories(self, conn, cursor):
+        """Replace the expense_type strings of older expense tables with category ids"""
+        cursor.execute(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() "
+            "AND TABLE_NAME = 'expense' AND COLUMN_NAME IN ('expense_type', 'category_id')"
+        )
+        columns = {row[0] for row in cursor.fetchall()}
+        if "expense_type" not in columns:
+            return
+        if "category_id" not in columns:
+            logger.info("Adding category_id column to expense table...")
+            cursor.execute(
+                "ALTER TABLE expense ADD COLUMN category_id MEDIUMINT UNSIGNED NULL AFTER txn_date, "
+                "ALGORITHM=INPLACE, LOCK=NONE"
+            )
+
+        # Types that are not built in become custom categories of the users who used them
+        builtin = ", ".join(["%s"] * len(BUILTIN_CATEGORY_IDS))
+        cursor.execute(
+            "INSERT IGNORE INTO category (userid, name) "
+            "SELECT DISTINCT userid, LEFT(expense_type, %s) FROM expense "
+            f"WHERE category_id IS NULL AND expense_type NOT IN ({builtin})",
+            (CATEGORY_NAME_MAX_LENGTH, *BUILTIN_CATEGORY_IDS)
+        )
+        conn.commit()
+
+        cursor.execute("SELECT MIN(id), MAX(id) FROM expense WHERE category_id IS NULL")
+        first_id, last_id = cursor.fetchone()
+        if first_id is not None:
+            logger.info("Backfilling expense.category_id from expense types...")
+            for start in range(first_id, last_id + 1, BACKFILL_BATCH_SIZE):
+                cursor.execute(
+                    "UPDATE expense e JOIN category c "
+                    "ON c.name = LEFT(e.expense_type, %s) AND (c.userid IS NULL OR c.userid = e.userid) "
+                    "SET e.category_id = c.id WHERE e.id >= %s AND e.id < %s AND e.category_id IS NULL",
+                    (CATEGORY_NAME_MAX_LENGTH, start, start + BACKFILL_BATCH_SIZE)
+                )
+                conn.commit()
+
+        cursor.execute("SELECT COUNT(*) FROM expense WHERE category_id IS NULL")
+        unmatched = cursor.fetchone()[0]
+        if unmatched:
+            raise RuntimeError(f"{unmatched} expense rows have no category; expense_type was left in place")
+
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() "
+            "AND TABLE_NAME = 'expense' AND INDEX_NAME = 'idx_expense_user_type_date'"
+        )
+        drop_type_index = "DROP INDEX idx_expense_user_type_date, " if cursor.fetchone()[0] else ""
+        logger.info("Switching expense table to category ids...")
+        cursor.execute(
+            "ALTER TABLE expense MODIFY category_id MEDIUMINT UNSIGNED NOT NULL, "
+            "ADD FOREIGN KEY (category_id) REFERENCES category(id), "
+            "ADD INDEX idx_expense_user_category_date (userid, category_id, txn_date, amount), "
+            f"{drop_type_index}DROP COLUMN expense_type"
+        )
+        # The rollup is derived data; it is recreated keyed by category id and rebuilt
+        cursor.execute("DROP TABLE IF EXISTS expense_monthly_rollup")
+        conn.commit()
+
+
+# SQLite
+
+SQLITE_PATH = "expense_tracker.db"
+
+SQLITE_EXPENSE_TABLE = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        userid TEXT NOT NULL REFERENCES userinfo(userid) ON DELETE CASCADE,
+        date TEXT NOT NULL,
+        txn_date DATE NULL,
+        category_id INTEGER NOT NULL REFERENCES category(id),
+        amount NUMERIC NOT NULL CHECK (amount > 0),
+        comment TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def _sqlite_date(value):
+    return date.fromisoformat(value) if value else None
+
+
+class SQLiteStorage(Storage):
+    """Embedded SQLite backend for machines without a MySQL server.
+
+    The database runs in WAL mode so readers never block the writer. Each
+    thread gets its own connection and writes are serialized by a lock.
+    DATE columns hold ISO text, converted here rather than with sqlite3's
+    process-wide adapters.
+    """
+
+    name = "sqlite"
+    placeholder = "?"
+    month_expr = "strftime('%Y-%m', {column})"
+    rollup_upsert = (
+        "INSERT INTO expense_monthly_rollup (userid, `year_month`, category_id, total, count) "
+        "VALUES (%s, %s, %s, %s, %s) "
+        "ON CONFLICT (userid, `year_month`, category_id) "
+        "DO UPDATE SET total = total + excluded.total, count = count + excluded.count"
+    )
+    seed_category = "INSERT OR IGNORE INTO category (id, userid, name) VALUES (%s, NULL, %s)"
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self._connect()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+
+    def initialize(self):
+        with self.connection() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS userinfo (
+                    userid TEXT PRIMARY KEY,
+                    password TEXT NOT NULL,
+                    user_name TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_login TIMESTAMP NULL DEFAULT NULL
+                );
+
+                CREATE TABLE IF NOT EXISTS category (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    userid TEXT NULL REFERENCES userinfo(userid) ON DELETE CASCADE,
+                    name TEXT NOT NULL,
+                    UNIQUE (userid, name)
+                );
+            """ + SQLITE_EXPENSE_TABLE.format(name="expense"))
+            self._seed_categories(conn.cursor())
+            conn.commit()
+            self._migrate_expense_categories(conn)
+
+            conn.executescript("""
+                CREATE INDEX IF NOT EXISTS idx_expense_user_date ON expense (userid, txn_date, id);
+                CREATE INDEX IF NOT EXISTS idx_expense_user_category_date ON expense (userid, category_id, txn_date, amount);
+                CREATE INDEX IF NOT EXISTS idx_expense_user_amount ON expense (userid, amount, id);
+
+                CREATE TABLE IF NOT EXISTS expense_monthly_rollup (
+                    userid TEXT NOT NULL REFERENCES userinfo(userid) ON DELETE CASCADE,
+                    `year_month` TEXT NOT NULL,
+                    category_id INTEGER NOT NULL,
+                    total NUMERIC NOT NULL DEFAULT 0,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (userid, `year_month`, category_id)
+                ) WITHOUT ROWID;
+            """)
+            self._populate_rollup_if_empty(conn)
+        logger.info(f"SQLite database ready at {self.path}")
+
+    def _migrate_expense_categories(self, conn):
+        """Rebuild older expense tables, whose rows name their type, with category ids"""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(expense)")}
+        if "expense_type" not in columns:
+            return
+
+        logger.info("Converting expense types to category ids...")
+        builtin = ", ".join(["?"] * len(BUILTIN_CATEGORY_IDS))
+        conn.execute("BEGIN")
+        try:
+            # Types that are not built in become custom categories of the users who used them
+            conn.execute(
+                "INSERT OR IGNORE INTO category (userid, name) "
+                f"SELECT DISTINCT userid, expense_type FROM expense WHERE expense_type NOT IN ({builtin})",
+                list(BUILTIN_CATEGORY_IDS)
+            )
+            # SQLite cannot change a column in place, so copy the rows into a table of the new shape
+            conn.execute(SQLITE_EXPENSE_TABLE.format(name="expense_new"))
+            converted = conn.execute(
+                "INSERT INTO expense_new (id, userid, date, txn_date, category_id, amount, comment, created_at, updated_at) "
+                "SELECT e.id, e.userid, e.date, e.txn_date, c.id, e.amount, e.comment, e.created_at, e.updated_at "
+                "FROM expense e JOIN category c ON c.name = e.expense_type AND (c.userid IS NULL OR c.userid = e.userid)"
+            ).rowcount
+            total = conn.execute("SELECT COUNT(*) FROM expense").fetchone()[0]
+            if converted != total:
+                raise RuntimeError(f"{total - converted} expense rows have no category; expense_type was left in place")
+            conn.execute("DROP TABLE expense")
+            conn.execute("ALTER TABLE expense_new RENAME TO expense")
+            # The rollup is derived data; it is recreated keyed by category id and rebuilt
+            conn.execute("DROP TABLE IF EXISTS expense_monthly_rollup")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info(f"Converted {converted} expense rows to category ids")
+
+    def add_transactions(self, rows):
+        with self._lock:
+            super().add_transactions(rows)
+
+    def _insert_params(self, rows):
+        return [
+            (userid, date_text, txn_date and txn_date.isoformat(), category_id, amount, comment)
+            for userid, date_text, txn_date, category_id, amount, comment in rows
+        ]
+
+    def history_page(self, userid, sort, after=None, limit=100):
+        is_date_sort = HISTORY_SORTS[sort][0] == "txn_date"
+        if after is not None and is_date_sort:
+            after = (after[0].isoformat(), after[1])
+        rows, next_key = super().history_page(userid, sort, after, limit)
+        rows = [row[:2] + (_sqlite_date(row[2]),) + row[3:] for row in rows]
+        if next_key is not None and is_date_sort:
+            next_key = (_sqlite_date(next_key[0]), next_key[1])
+        return rows, next_key
+
+    def stream_transactions(self, userid, chunk_size, cancel_event=None):
+        chunks = super().stream_transactions(userid, chunk_size, cancel_event)
+        with contextlib.closing(chunks):
+            for rows in chunks:
+                yield [
+                    (date_text, _sqlite_date(txn_date), amount, expense_type, comment)
+                    for date_text, txn_date, amount, expense_type, comment in rows
+                ]
+
+    def record_login(self, userid):
+        with self._lock:
+            super().record_login(userid)
+
+    def create_user(self, userid, password, user_name):
+        with self._lock:
+            return super().create_user(userid, password, user_name)
+
+    def create_category(self, userid, name):
+        with self._lock:
+            return super().create_category(userid, name)
+
+    def rebuild_monthly_rollup(self, userid=None):
+        with self._lock:
+            super().rebuild_monthly_rollup(userid)
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                with contextlib.suppress(sqlite3.Error):
+                    conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def create_storage(backend=None, on_reconnect=None):
+    """Create the storage backend selected by STORAGE_BACKEND in .env (mysql or sqlite)"""
+    backend = (backend or os.getenv("STORAGE_BACKEND", "mysql")).lower()
+
+    if backend == "mysql":
+        return MySQLStorage(
+            config={
+                "host": os.getenv("DB_HOST", DB_CONFIG["host"]),
+                "user": os.getenv("DB_USER", DB_CONFIG["user"]),
+                "password": os.getenv("DB_PASSWORD", DB_CONFIG["password"]),
+                "port": int(os.getenv("DB_PORT", DB_CONFIG["port"])),
+            },
+            database=os.getenv("DB_NAME", DB_NAME),
+            pool_size=int(os.getenv("DB_POOL_SIZE", DB_POOL_SIZE)),
+            recycle_seconds=int(os.getenv("DB_POOL_RECYCLE_SECONDS", DB_POOL_RECYCLE_SECONDS)),
+            on_reconnect=on_reconnect,
+        )
+    if backend == "sqlite":
+        return SQLiteStorage(path=os.getenv("SQLITE_PATH", SQLITE_PATH))
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,250 @@
+import contextlib
+import csv
+import logging
+import os
+import threading
+from datetime import datetime
+
+from expense_tracker.storage import BUILTIN_CATEGORY_IDS
+from expense_tracker.validation import InputValidator
+
+
+logger = logging.getLogger('ExpenseTracker')
+
+
+# Rows parsed per chunk and rows inserted per transaction during imports
+IMPORT_CHUNK_SIZE = 10000
+IMPORT_BATCH_SIZE = 1000
+
+# Template column -> expense column; comments are optional
+IMPORT_COLUMNS = {"date": "Date", "amount": "Amount", "type": "Type", "comment": "Comments"}
+
+
+class TransactionImporter:
+    """Stream transactions from an Excel or CSV file into the expense table.
+
+    Files are read in chunks, each chunk is validated column-wise and the
+    valid rows are written with executemany in batches of batch_size rows.
+    categories maps the user's category names to ids; rows of any other
+    type are rejected.
+    """
+
+    def __init__(self, storage, userid, batch_size=IMPORT_BATCH_SIZE, chunk_size=IMPORT_CHUNK_SIZE, progress=None,
+                 categories=None):
+        self.storage = storage
+        self.userid = userid
+        self.categories = categories or BUILTIN_CATEGORY_IDS
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.progress = progress
+
+    def run(self, path):
+        """Import a file and return counts of rows read, inserted and rejected"""
+        stats = {"read": 0, "inserted": 0, "rejected": 0}
+        logger.info(f"Importing transactions for {self.userid} from {path}")
+
+        for chunk in self._read_chunks(path):
+            rows, rejected = self._validate(chunk)
+            inserted = self._insert(rows)
+            stats["read"] += len(chunk)
+            stats["inserted"] += inserted
+            stats["rejected"] += rejected + len(rows) - inserted
+            if self.progress:
+                self.progress(stats)
+
+        logger.info(f"Import finished: {stats}")
+        return stats
+
+    def _read_chunks(self, path):
+        import pandas as pd
+
+        with open(path, "rb") as f:
+            is_workbook = f.read(4) == b"PK\x03\x04"
+
+        if not is_workbook:
+            yield from pd.read_csv(path, chunksize=self.chunk_size, dtype=str, keep_default_na=False, skipinitialspace=True)
+            return
+
+        import openpyxl
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(name) if name is not None else "" for name in next(rows, [])]
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= self.chunk_size:
+                    yield pd.DataFrame(batch, columns=header)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=header)
+        finally:
+            workbook.close()
+
+    def _validate(self, chunk):
+        import pandas as pd
+
+        headers = {str(name).strip().lower(): name for name in chunk.columns}
+        columns = {key: headers.get(title.lower()) for key, title in IMPORT_COLUMNS.items()}
+        missing = [IMPORT_COLUMNS[key] for key, name in columns.items() if key != "comment" and name is None]
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+        raw_amounts = chunk[columns["amount"]]
+        if not pd.api.types.is_numeric_dtype(raw_amounts):
+            raw_amounts = raw_amounts.astype(str).str.replace(",", "", regex=False)
+        amounts_ok, amounts, _ = InputValidator.validate_amounts(raw_amounts)
+        # Amounts are stored with two decimals, so one that rounds to 0.00 would fail the amount > 0 check
+        amounts = amounts.round(2)
+        amounts_ok &= (amounts > 0).to_numpy()
+
+        dates_ok, dates, _ = InputValidator.validate_dates(chunk[columns["date"]], formats=("%d/%m/%Y", "ISO8601"))
+        dates = dates.dt.normalize()
+
+        types = chunk[columns["type"]].astype(str).str.strip()
+        if columns["comment"] is not None:
+            comments = chunk[columns["comment"]].fillna("").astype(str).str.strip()
+        else:
+            comments = pd.Series("", index=chunk.index)
+
+        category_ids = types.map(self.categories)
+        valid = amounts_ok & dates_ok & category_ids.notna().to_numpy()
+
+        valid_dates = dates[valid]
+        rows = list(zip(
+            [self.userid] * int(valid.sum()),
+            valid_dates.dt.strftime("%d/%m/%Y").tolist(),
+            valid_dates.dt.date.tolist(),
+            category_ids[valid].astype(int).tolist(),
+            amounts[valid].tolist(),
+            comments[valid].tolist(),
+        ))
+        return rows, int((~valid).sum())
+
+    def _insert(self, rows):
+        """Insert rows in batches; returns how many were stored"""
+        inserted = 0
+        for start in range(0, len(rows), self.batch_size):
+            inserted += self._insert_batch(rows[start:start + self.batch_size])
+        return inserted
+
+    def _insert_batch(self, batch):
+        try:
+            self.storage.add_transactions(batch)
+            return len(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                logger.warning(f"Import rejected a row the database refused: {e}")
+                return 0
+            # One bad row must not fail the rest of the batch; retry them one by one
+            logger.warning(f"Import batch of {len(batch)} rows failed, retrying individually: {e}")
+            inserted = sum(self._insert_batch([row]) for row in batch)
+            if not inserted:
+                # Nothing went in, so the database itself is failing rather than some rows
+                raise
+            return inserted
+
+
+# Rows fetched from the server and written per chunk during exports
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_FORMATS = {".csv": "csv", ".xlsx": "xlsx", ".parquet": "parquet"}
+
+
+class TransactionExporter:
+    """Stream a user's full transaction history to a CSV, XLSX or Parquet file.
+
+    Rows are read from an unbuffered cursor with fetchmany and written chunk
+    by chunk, so memory stays bounded by chunk_size whatever the history
+    size. Setting cancel_event stops the export and removes the partial file.
+    The columns follow expense_template.xlsx, so exports can be re-imported.
+    """
+
+    HEADER = [IMPORT_COLUMNS[key] for key in ("date", "amount", "type", "comment")]
+
+    def __init__(self, storage, userid, chunk_size=EXPORT_CHUNK_SIZE, progress=None, cancel_event=None):
+        self.storage = storage
+        self.userid = userid
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.cancel_event = cancel_event or threading.Event()
+
+    def run(self, path):
+        """Export to path, choosing the format from its extension; returns rows written and whether it was cancelled"""
+        file_format = EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+        if file_format is None:
+            raise ValueError("Export file must end in .csv, .xlsx or .parquet")
+
+        logger.info(f"Exporting transactions for {self.userid} to {path}")
+        writer = getattr(self, f"_write_{file_format}")
+        stats = {"written": 0, "cancelled": False}
+        chunks = self._read_chunks(stats)
+        try:
+            writer(path, chunks)
+        except Exception:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            raise
+        finally:
+            chunks.close()
+
+        if stats["cancelled"]:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            logger.info("Export cancelled")
+        else:
+            logger.info(f"Export finished: {stats['written']} rows")
+        return stats
+
+    def _read_chunks(self, stats):
+        source = self.storage.stream_transactions(self.userid, self.chunk_size, self.cancel_event)
+        try:
+            for rows in source:
+                yield [
+                    (txn_date or datetime.strptime(date, "%d/%m/%Y").date(), float(amount), expense_type, comment or "")
+                    for date, txn_date, amount, expense_type, comment in rows
+                ]
+                stats["written"] += len(rows)
+                if self.progress:
+                    self.progress(dict(stats))
+            stats["cancelled"] = self.cancel_event.is_set()
+        finally:
+            source.close()
+
+    def _write_csv(self, path, chunks):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.HEADER)
+            for chunk in chunks:
+                writer.writerows(
+                    (txn_date.strftime("%d/%m/%Y"), f"{amount:.2f}", expense_type, comment)
+                    for txn_date, amount, expense_type, comment in chunk
+                )
+
+    def _write_xlsx(self, path, chunks):
+        import openpyxl
+
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("Transactions")
+        sheet.append(self.HEADER)
+        for chunk in chunks:
+            for row in chunk:
+                sheet.append(row)
+        workbook.save(path)
+
+    def _write_parquet(self, path, chunks):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires the pyarrow package") from None
+
+        schema = pa.schema([
+            (self.HEADER[0], pa.date32()),
+            (self.HEADER[1], pa.float64()),
+            (self.HEADER[2], pa.string()),
+            (self.HEADER[3], pa.string()),
+        ])
+        with pq.ParquetWriter(path, schema) as writer:
+            for chunk in chunks:
+                columns = list(zip(*chunk))
+                writer.write_table(pa.Table.from_arrays([pa.array(c, type=f.type) for c, f in zip(columns, schema)], schema=schema))
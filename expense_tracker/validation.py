@@ -0,0 +1,122 @@
+from datetime import datetime
+
+
+class InputValidator:
+    # Error codes returned by the batch validators; OK marks a valid row
+    OK = 0
+    INVALID_AMOUNT = 1
+    NON_POSITIVE_AMOUNT = 2
+    INVALID_DATE = 3
+    FUTURE_DATE = 4
+
+    # Largest value of the DECIMAL(10,2) amount column
+    MAX_AMOUNT = 99999999.99
+
+    ERROR_MESSAGES = {
+        INVALID_AMOUNT: "Amount must be a valid number",
+        NON_POSITIVE_AMOUNT: "Amount must be greater than 0",
+        INVALID_DATE: "Invalid date format. Please use dd/mm/yyyy",
+        FUTURE_DATE: "Date cannot be in the future",
+    }
+
+    @staticmethod
+    def validate_amount(amount_str):
+        """Validate amount input"""
+        try:
+            amount = float(amount_str)
+            if amount <= 0:
+                return False, "Amount must be greater than 0"
+            return True, amount
+        except ValueError:
+            return False, "Amount must be a valid number"
+
+    @staticmethod
+    def validate_date(date_str):
+        """Validate date input"""
+        try:
+            date = datetime.strptime(date_str, "%d/%m/%Y")
+            if date > datetime.now():
+                return False, "Date cannot be in the future"
+            return True, date
+        except ValueError:
+            return False, "Invalid date format. Please use dd/mm/yyyy"
+
+    @staticmethod
+    def validate_amounts(values):
+        """Validate a column of amounts.
+
+        Returns (mask, amounts, errors): a boolean array of valid rows, the
+        parsed amounts as a float Series (NaN where unparseable) and an int8
+        array of error codes.
+        """
+        import numpy as np
+        import pandas as pd
+
+        values = pd.Series(values)
+        if not pd.api.types.is_numeric_dtype(values):
+            values = values.astype(str).str.strip()
+        amounts = pd.to_numeric(values, errors="coerce").astype(float)
+
+        errors = np.full(len(amounts), InputValidator.OK, dtype=np.int8)
+        errors[(amounts <= 0).to_numpy()] = InputValidator.NON_POSITIVE_AMOUNT
+        # NaN, infinities and values too large for the amount column
+        out_of_range = ~np.isfinite(amounts.to_numpy()) | (amounts > InputValidator.MAX_AMOUNT).to_numpy()
+        errors[out_of_range] = InputValidator.INVALID_AMOUNT
+        return errors == InputValidator.OK, amounts, errors
+
+    @staticmethod
+    def validate_dates(values, formats=("%d/%m/%Y",), now=None):
+        """Validate a column of dates in one vectorized pass.
+
+        Each format is tried in turn on the rows still unparsed, and "now" is
+        read once for the whole batch. Returns (mask, dates, errors) like
+        validate_amounts, with dates as a datetime Series (NaT where invalid).
+        """
+        import numpy as np
+        import pandas as pd
+
+        values = pd.Series(values)
+        dates = pd.to_datetime(values, format=formats[0], errors="coerce")
+        for date_format in formats[1:]:
+            unparsed = dates.isna()
+            if not unparsed.any():
+                break
+            dates[unparsed] = pd.to_datetime(values[unparsed], format=date_format, errors="coerce")
+
+        now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+        errors = np.full(len(dates), InputValidator.OK, dtype=np.int8)
+        errors[(dates > now).to_numpy()] = InputValidator.FUTURE_DATE
+        errors[dates.isna().to_numpy()] = InputValidator.INVALID_DATE
+        return errors == InputValidator.OK, dates, errors
+
+    @staticmethod
+    def validate_category_name(name):
+        """Validate the name of a new category"""
+        name = (name or "").strip()
+        if not name:
+            return False, "Category name is required"
+        if len(name) > 64:
+            return False, "Category name must be at most 64 characters long"
+        return True, name
+
+    @staticmethod
+    def validate_userid(userid):
+        """Validate user ID"""
+        if not userid or len(userid) < 3:
+            return False, "User ID must be at least 3 characters long"
+        if not userid.isalnum():
+            return False, "User ID must contain only letters and numbers"
+        return True, userid
+
+    @staticmethod
+    def validate_password(password):
+        """Validate password"""
+        if not password or len(password) < 6:
+            return False, "Password must be at least 6 characters long"
+        if not any(c.isupper() for c in password):
+            return False, "Password must contain at least one uppercase letter"
+        if not any(c.islower() for c in password):
+            return False, "Password must contain at least one lowercase letter"
+        if not any(c.isdigit() for c in password):
+            return False, "Password must contain at least one number"
+        return True, password
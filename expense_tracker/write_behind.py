@@ -0,0 +1,110 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+logger = logging.getLogger('ExpenseTracker')
+
+_FLUSH = object()
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Collect transaction inserts and commit them in groups.
+
+    A writer thread takes queued rows and commits them with one multi-row
+    insert and one commit as soon as max_rows rows are waiting or the oldest
+    row has waited max_delay_ms. submit() returns a Future that completes
+    only once the row's batch is committed, or fails with the commit error,
+    so callers waiting on it get durable acknowledgment.
+    """
+
+    def __init__(self, storage, max_rows=500, max_delay_ms=50):
+        self.storage = storage
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """Queue a (userid, date, txn_date, category_id, amount, comment) row; returns a Future"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Write-behind queue is closed")
+            self._queue.put((row, future))
+        return future
+
+    def flush(self, timeout=None):
+        """Commit everything queued so far and wait for it"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                return
+            self._queue.put((_FLUSH, future))
+        future.result(timeout)
+
+    def close(self, timeout=10):
+        """Stop accepting rows, commit what is queued and stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put((_STOP, None))
+        self._thread.join(timeout)
+        logger.info(f"Write-behind queue closed after {self.rows} rows in {self.batches} commits")
+
+    def _run(self):
+        while True:
+            batch, waiters, stop = self._collect()
+            if batch:
+                self._commit(batch)
+            for waiter in waiters:
+                waiter.set_result(None)
+            if stop:
+                return
+
+    def _collect(self):
+        """Block for the first row, then gather more until the batch is full or its deadline passes"""
+        batch, waiters = [], []
+        item, future = self._queue.get()
+        deadline = time.monotonic() + self.max_delay
+        while True:
+            if item is _STOP:
+                return batch, waiters, True
+            if item is _FLUSH:
+                waiters.append(future)
+                return batch, waiters, False
+            batch.append((item, future))
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.max_rows or remaining <= 0:
+                return batch, waiters, False
+            try:
+                item, future = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch, waiters, False
+
+    def _commit(self, batch):
+        try:
+            self.storage.add_transactions([row for row, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"Write-behind insert failed: {e}")
+                batch[0][1].set_exception(e)
+                return
+            # One bad row must not fail the rest of the group; retry them one by one
+            logger.warning(f"Write-behind commit of {len(batch)} rows failed, retrying individually: {e}")
+            for item in batch:
+                self._commit([item])
+            return
+        self.batches += 1
+        self.rows += len(batch)
+        for _, future in batch:
+            future.set_result(None)
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from expense_tracker.core import ExpenseService
+from expense_tracker.server import ExpenseServer
+
+
+class ServerLoopbackTest(unittest.IsolatedAsyncioTestCase):
+    """Drive ExpenseServer over a loopback socket against a throwaway SQLite database"""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        env = mock.patch.dict(os.environ, {"SQLITE_PATH": os.path.join(self.tmp.name, "test.db")})
+        env.start()
+        self.addCleanup(env.stop)
+
+        self.service = ExpenseService(backend="sqlite")
+        self.service.create_user("alice1", "Secret123!", "Alice")
+        self.server = await ExpenseServer(self.service, port=0, workers=2).start()
+        _, login = await self.request("POST", "/login", {"userid": "alice1", "password": "Secret123!"})
+        self.token = login["token"]
+
+    async def asyncTearDown(self):
+        await self.server.close()
+        self.service.close()
+        self.tmp.cleanup()
+
+    async def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        token = getattr(self, "token", None)
+        head = f"{method} {path} HTTP/1.1\r\nConnection: close\r\nContent-Length: {len(body)}\r\n"
+        if token:
+            head += f"Authorization: Bearer {token}\r\n"
+        return await self.send(head.encode() + b"\r\n" + body)
+
+    async def send(self, data):
+        """Send raw request bytes and return (status, parsed JSON body)"""
+        reader, writer = await asyncio.open_connection(self.server.host, self.server.port)
+        writer.write(data)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+        status_line, _, rest = response.partition(b"\r\n")
+        return int(status_line.split()[1]), json.loads(rest.partition(b"\r\n\r\n")[2])
+
+    async def test_transaction_with_missing_fields_is_rejected(self):
+        for payload in (
+            {"type": "Housing", "date": "01/01/2024"},
+            {"amount": None, "type": "Housing", "date": "01/01/2024"},
+            {"amount": 10, "type": "Housing"},
+            {"amount": 10, "type": "Housing", "date": None},
+            {"amount": [10], "type": "Housing", "date": "01/01/2024"},
+            {"amount": 10, "type": ["Housing"], "date": "01/01/2024"},
+        ):
+            status, body = await self.request("POST", "/transactions", payload)
+            self.assertEqual(status, 400, payload)
+            self.assertIn("error", body)
+
+    async def test_bulk_reports_invalid_rows_and_stores_the_rest(self):
+        status, body = await self.request("POST", "/transactions/bulk", {"transactions": [
+            {"amount": 10, "type": "Housing", "date": "01/01/2024"},
+            {"amount": None, "type": "Housing", "date": "01/01/2024"},
+            {"amount": 20, "type": "Housing"},
+            {"amount": 30, "type": "Housing", "date": "02/01/2024"},
+        ]})
+        self.assertEqual(status, 201)
+        self.assertEqual(body["added"], 2)
+        self.assertEqual([error["index"] for error in body["errors"]], [1, 2])
+
+        _, totals = await self.request("GET", "/dashboard")
+        self.assertEqual(totals["count"], 2)
+        self.assertEqual(totals["total_expense"], 40)
+
+    async def test_category_name_must_be_a_string(self):
+        for payload in ({"name": 5}, {"name": None}, {}):
+            status, _ = await self.request("POST", "/categories", payload)
+            self.assertEqual(status, 400, payload)
+
+
+    async def test_non_finite_and_huge_amounts_are_rejected(self):
+        for amount in ("nan", "inf", "-inf", "1e12", 1e12):
+            payload = {"amount": amount, "type": "Housing", "date": "01/01/2024"}
+            status, _ = await self.request("POST", "/transactions", payload)
+            self.assertEqual(status, 400, payload)
+
+        status, totals = await self.request("GET", "/dashboard")
+        self.assertEqual(status, 200)
+        self.assertEqual(totals["count"], 0)
+
+    async def test_login_fields_must_be_strings(self):
+        for payload in ({"userid": ["alice1"], "password": "Secret123!"}, {"userid": "alice1", "password": 5}):
+            status, _ = await self.request("POST", "/login", payload)
+            self.assertEqual(status, 400, payload)
+
+    async def test_malformed_requests_get_400(self):
+        status, _ = await self.send(b"POST /login HTTP/1.1\r\nContent-Length: -1\r\n\r\n")
+        self.assertEqual(status, 400)
+        status, _ = await self.send(b"GET /dashboard HTTP/1.1\r\nX-Padding: " + b"a" * 70000 + b"\r\n\r\n")
+        self.assertEqual(status, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()